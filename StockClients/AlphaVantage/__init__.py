@@ -1 +1,17 @@
-from .av_client import AlphaVantageClient
\ No newline at end of file
+import importlib
+
+lazy_attributes = {"AlphaVantageClient": ".av_client"}
+
+
+def __getattr__(name):
+    if name in lazy_attributes:
+        module = importlib.import_module(lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(lazy_attributes))
@@ -1,11 +1,128 @@
+import io
+import os
+import json
+import hashlib
+from datetime import datetime
 import pandas as pd
 import requests
-import duckdb
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ..output import PANDAS, check_format, convert_frame
+from ..singleflight import SingleFlight
+from ..errors import ErrorCollector
+
+# Typed columns for the CSV endpoints
+csv_dtypes = {
+    "LISTING_STATUS": {
+        "symbol": "category",
+        "name": str,
+        "exchange": "category",
+        "assetType": "category",
+        "status": "category",
+    },
+    "EARNINGS_CALENDAR": {
+        "symbol": "category",
+        "name": str,
+        "estimate": float,
+        "currency": "category",
+    },
+}
+
+csv_dates = {
+    "LISTING_STATUS": ["ipoDate", "delistingDate"],
+    "EARNINGS_CALENDAR": ["reportDate", "fiscalDateEnding"],
+}
+
+
+def check_csv(body: bytes):
+    # Rate limits and bad keys come back as 200 with a JSON "Note",
+    # "Information" or "Error Message" body instead of CSV
+    if body.lstrip()[:1] in (b"{", b"["):
+        try:
+            message = json.loads(body)
+        except ValueError:
+            message = body[:200]
+        raise ValueError(f"AlphaVantage returned no CSV: {message}")
+
+
+def parse_csv_body(body: bytes, function: str):
+    if len(body.strip()) == 0:
+        return pd.DataFrame()
+
+    # The body is already in memory, one typed read_csv call
+    df = pd.read_csv(io.BytesIO(body), dtype=csv_dtypes.get(function))
+    for column in csv_dates.get(function, []):
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors="coerce", format="%Y-%m-%d")
+
+    return df
+
+
+def eps_history_frame(ticker: str, data):
+    # EARNINGS response as (hticker, eadate, datadate, av_actual, av_est),
+    # None when there's no quarterly history
+    quarterly = data.get("quarterlyEarnings") if len(data) > 0 else None
+    if not quarterly:
+        return None
+
+    import duckdb
+
+    tmp = pd.DataFrame(quarterly)
+    mem_db = duckdb.connect()
+    tmp["hticker"] = ticker.replace("-", ".")
+    tmp["datadate"] = pd.to_datetime(
+        tmp["fiscalDateEnding"], format="%Y-%m-%d"
+    ).dt.strftime("%Y%m%d")
+    tmp["eadate"] = pd.to_datetime(
+        tmp["reportedDate"], format="%Y-%m-%d"
+    ).dt.strftime("%Y%m%d")
+    return mem_db.execute(
+        """
+     select distinct a.hticker, a.eadate,a.datadate, a.reportedEPS as av_actual, a.estimatedEPS as av_est,
+     from tmp as a
+     where a.hticker is not null and a.eadate is not null
+     order by hticker, eadate;"""
+    ).df()
 
 
 class AlphaVantageClient:
-    def __init__(self, api_key):
+    def __init__(
+        self,
+        api_key,
+        cache_dir=None,
+        timeout=30,
+        retries=3,
+        output_format=PANDAS,
+        flights: SingleFlight = None,
+        errors: ErrorCollector = None,
+        archive=None,
+        symbol_table=None,
+    ):
         self.api_key = api_key
+        self.output_format = check_format(output_format)
+        # Identical concurrent requests share one fetch and parse. Keys leave out
+        # client settings (symbol table, archive, errors), so only clients
+        # configured alike should share a SingleFlight
+        self.flights = flights if flights is not None else SingleFlight()
+        self.errors = errors if errors is not None else ErrorCollector()
+        self.archive = archive
+        # Optional SymbolTable, adds a symbol_id column
+        self.symbol_table = symbol_table
+        # Listing and calendar CSVs only change once a day, when cache_dir is
+        # set they are kept on disk and re-downloaded at most daily
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        adapter = HTTPAdapter(
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+            )
+        )
+        self.session.mount("https://", adapter)
 
     def get_active_tickers(self):
         url = (
@@ -13,7 +130,8 @@ class AlphaVantageClient:
             + self.api_key
         )
 
-        return pd.read_csv(url)
+        df = self.read_csv(url, "LISTING_STATUS")
+        return self.format_output(df, "symbol")
 
     def get_delisted_tickers(self):
         url = (
@@ -21,48 +139,114 @@ class AlphaVantageClient:
             + self.api_key
         )
 
-        return pd.read_csv(url)
+        df = self.read_csv(url, "LISTING_STATUS")
+        return self.format_output(df, "symbol")
 
     def get_erd(self, horizon="3month"):
         url = f"https://www.alphavantage.co/query?function=EARNINGS_CALENDAR&horizon={horizon}&apikey={self.api_key}"
 
-        return pd.read_csv(url)
+        df = self.read_csv(url, "EARNINGS_CALENDAR")
+        return self.format_output(df, "symbol")
+
+    def format_output(self, df: pd.DataFrame, symbol_column: str):
+        if self.symbol_table is not None:
+            from ..symbols import add_symbol_ids
+
+            df = add_symbol_ids(df.copy(), symbol_column, self.symbol_table)
+        return convert_frame(df, self.output_format)
+
+    def read_csv(self, url: str, function: str):
+        # Keyed without the api key
+        key = ("av_csv", url.replace(self.api_key, ""))
+        return self.flights.do(key, lambda: self.parse_csv(url, function))
+
+    def parse_csv(self, url: str, function: str):
+        return parse_csv_body(self.fetch_csv(url), function)
+
+    def cache_path(self, url: str):
+        # Key on the url without the api key
+        key = url.replace(self.api_key, "")
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    def fetch_csv(self, url: str) -> bytes:
+        meta = {}
+        path = None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.cache_path(url)
+            if os.path.exists(path + ".json") and os.path.exists(path + ".csv"):
+                with open(path + ".json", "r") as f:
+                    meta = json.load(f)
+
+                # Fresh for the rest of the day it was downloaded
+                if meta.get("date") == datetime.now().strftime("%Y%m%d"):
+                    with open(path + ".csv", "rb") as f:
+                        return f.read()
+
+        # Conditional refresh when the server gave us validators
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        buffer = io.BytesIO()
+        with self.session.get(
+            url, headers=headers, stream=True, timeout=self.timeout
+        ) as res:
+            if res.status_code == 304 and path:
+                with open(path + ".csv", "rb") as f:
+                    body = f.read()
+                meta["date"] = datetime.now().strftime("%Y%m%d")
+                with open(path + ".json", "w") as f:
+                    json.dump(meta, f)
+                return body
+
+            res.raise_for_status()
+            for block in res.iter_content(chunk_size=1 << 16):
+                buffer.write(block)
+
+            body = buffer.getvalue()
+            # Checked before caching, or an error would be served all day
+            check_csv(body)
+            if self.archive is not None:
+                self.archive.put("alphavantage_csv", body, {"url": url})
+            if path:
+                with open(path + ".csv", "wb") as f:
+                    f.write(body)
+                with open(path + ".json", "w") as f:
+                    json.dump(
+                        {
+                            "date": datetime.now().strftime("%Y%m%d"),
+                            "etag": res.headers.get("ETag"),
+                            "last_modified": res.headers.get("Last-Modified"),
+                        },
+                        f,
+                    )
+
+        return body
 
     def get_eps_history(self, ticker):
+        if ticker is None:
+            return self.fetch_eps_history(ticker)
+
+        key = ("av_eps", ticker.strip().upper(), self.output_format)
+        return self.flights.do(key, lambda: self.fetch_eps_history(ticker))
+
+    def fetch_eps_history(self, ticker):
         try:
             assert ticker is not None
             ticker = ticker.strip().upper()
             BASE_URL = "https://www.alphavantage.co/query?"
             url = f"{BASE_URL}function=EARNINGS&symbol={ticker}&apikey={self.api_key}"
-            res = requests.get(url)
-
-            if len(res.json()) > 0:
-                keys = list(res.json().keys())
-                if "quarterlyEarnings" in keys:
-                    tmp = pd.DataFrame(res.json()["quarterlyEarnings"])
-                    tic = ticker.replace("-", ".")
-
-                    if len(tmp) > 0:
-                        mem_db = duckdb.connect()
-                        tmp["hticker"] = tic
-                        tmp["hticker"] = tmp["hticker"].str.replace(
-                            "-", ".", regex=True
-                        )
-                        tmp["datadate"] = pd.to_datetime(
-                            tmp["fiscalDateEnding"], format="%Y-%m-%d"
-                        ).dt.strftime("%Y%m%d")
-                        tmp["eadate"] = pd.to_datetime(
-                            tmp["reportedDate"], format="%Y-%m-%d"
-                        ).dt.strftime("%Y%m%d")
-                        df = mem_db.execute(
-                            """
-                         select distinct a.hticker, a.eadate,a.datadate, a.reportedEPS as av_actual, a.estimatedEPS as av_est,
-                         from tmp as a
-                         where a.hticker is not null and a.eadate is not null
-                         order by hticker, eadate;"""
-                        ).df()
-
-                        return df
+            res = self.session.get(url, timeout=self.timeout)
+            if self.archive is not None and res.ok:
+                self.archive.put("alphavantage_eps", res.text, {"url": url})
+
+            df = eps_history_frame(ticker, res.json())
+            if df is not None:
+                return self.format_output(df, "hticker")
 
         except Exception as e:
-            print(f"EPS History error for {ticker}: {str(e)}")
+            self.errors.record("eps_history", ticker, e)
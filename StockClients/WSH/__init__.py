@@ -1 +1,21 @@
-from .wsh_client import WSHClient
\ No newline at end of file
+import importlib
+
+lazy_attributes = {
+    "WSHClient": ".wsh_client",
+    "WindowPlanner": ".window_planner",
+    "WSHSync": ".sync",
+}
+
+
+def __getattr__(name):
+    if name in lazy_attributes:
+        module = importlib.import_module(lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(lazy_attributes))
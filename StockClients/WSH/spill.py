@@ -0,0 +1,81 @@
+from collections import defaultdict
+from typing import Dict, List
+import os
+
+import pandas as pd
+
+# Memory-bounded output for large WSH pulls. Parsed window frames are
+# buffered per class and flushed to Parquet part files once the buffer holds
+# buffer_rows rows, so peak memory is bounded by the buffer instead of the
+# whole horizon. Results are read back lazily through DuckDB.
+
+
+class ParquetSpill:
+    def __init__(self, out_dir: str, buffer_rows=100_000):
+        self.out_dir = out_dir
+        self.buffer_rows = buffer_rows
+        self.buffers = defaultdict(list)
+        self.buffered = defaultdict(int)
+        self.parts = defaultdict(list)
+
+    def class_dir(self, cls: str):
+        return os.path.join(self.out_dir, cls)
+
+    def append(self, cls: str, df: pd.DataFrame):
+        if len(df) == 0:
+            return
+
+        self.buffers[cls].append(df)
+        self.buffered[cls] += len(df)
+        if self.buffered[cls] >= self.buffer_rows:
+            self.flush(cls)
+
+    def flush(self, cls: str):
+        if self.buffered[cls] == 0:
+            return
+
+        os.makedirs(self.class_dir(cls), exist_ok=True)
+        name = f"part-{len(self.parts[cls]):05d}.parquet"
+        path = os.path.join(self.class_dir(cls), name)
+
+        df = pd.concat(self.buffers[cls], ignore_index=True)
+        df.to_parquet(path, index=False)
+        self.parts[cls].append(path)
+
+        self.buffers[cls] = []
+        self.buffered[cls] = 0
+
+    def close(self):
+        for cls in list(self.buffers):
+            self.flush(cls)
+        return SpilledResult(dict(self.parts))
+
+
+class SpilledResult:
+    def __init__(self, parts: Dict[str, List[str]]):
+        self.parts = parts
+
+    @property
+    def classes(self):
+        return list(self.parts)
+
+    def scan(self, cls: str):
+        files = ", ".join(
+            "'" + path.replace("'", "''") + "'" for path in self.parts[cls]
+        )
+        # Part files can differ in columns that were all empty in one flush
+        return f"read_parquet([{files}], union_by_name = true)"
+
+    def view(self, cls: str, db=None, name: str = None):
+        import duckdb
+
+        db = db if db is not None else duckdb.connect()
+        name = name or f"wsh_{cls}"
+        scan = self.scan(cls)
+        db.execute(f'create or replace view "{name}" as select * from {scan}')
+        return db
+
+    def to_pandas(self, cls: str):
+        import duckdb
+
+        return duckdb.sql(f"select * from {self.scan(cls)}").df()
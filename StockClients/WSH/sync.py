@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+from typing import List
+import pandas as pd
+
+from .wsh_client import WSHClient
+
+DATE_FORMAT = "%m/%d/%Y"
+STORE_FILENAME = "wsh_store.duckdb"
+# Windows are cut from a fixed grid starting on this Monday, so a window is
+# the same whatever range it's synced as part of
+GRID_ORIGIN = datetime(2000, 1, 3).date()
+
+
+class WSHSync:
+    # Incremental WSH refresh into a local DuckDB store.
+    #
+    # WSH can't filter on the updated timestamp, so re-queries are narrowed to
+    # windows that can still change: windows never synced before, and windows
+    # that end less than settle_days before today. Rows of a window synced
+    # before are upserted by event_id only if their updated timestamp is past
+    # the class watermark.
+    #
+    # Windows are window_days long (Monday to Sunday weeks by default) on a
+    # grid anchored at GRID_ORIGIN, and always fetched whole, so coverage
+    # carries over between overlapping or shifted date ranges.
+    def __init__(
+        self, client: WSHClient, path=STORE_FILENAME, settle_days=30, window_days=7
+    ):
+        if client.output_format != "pandas":
+            raise ValueError("WSHSync needs a client with pandas output")
+
+        self.client = client
+        self.settle_days = settle_days
+        self.window_days = window_days
+
+        import duckdb
+
+        self.db = duckdb.connect(path)
+        self.db.execute(
+            """
+            create table if not exists wsh_watermarks (
+                cls varchar primary key,
+                updated timestamptz
+            );
+            create table if not exists wsh_windows (
+                cls varchar,
+                window_from date,
+                window_to date,
+                synced_at timestamptz,
+                primary key (cls, window_from, window_to)
+            );
+            """
+        )
+
+    def close(self):
+        self.db.close()
+
+    def table_name(self, cls: str):
+        return f'"wsh_{cls}"'
+
+    def sync(self, classes: List[str], date_start, date_end):
+        counts = {}
+        for cls in classes:
+            counts[cls] = 0
+            watermark = self.get_watermark(cls)
+
+            for dates, seen in self.stale_windows(cls, date_start, date_end):
+                dfs = self.client.run_query([cls], dates[0], dates[1])
+                df = dfs.get(cls)
+
+                if df is not None and len(df) > 0:
+                    updated = self.updated_timestamps(df["updated"])
+                    # Windows synced before only need rows changed since then
+                    if seen and watermark is not None:
+                        df = df[(updated > watermark) | updated.isna()]
+                        updated = updated[df.index]
+
+                    if len(df) > 0:
+                        self.upsert(cls, df)
+                        counts[cls] += len(df)
+
+                        newest = updated.max()
+                        if pd.notna(newest) and (
+                            watermark is None or newest > watermark
+                        ):
+                            self.set_watermark(cls, newest)
+
+                self.mark_synced(cls, dates)
+
+        return counts
+
+    def stale_windows(self, cls: str, date_start, date_end):
+        synced = set(
+            self.db.execute(
+                "select window_from, window_to from wsh_windows where cls = ?",
+                [cls],
+            ).fetchall()
+        )
+        settled_before = (datetime.now() - timedelta(days=self.settle_days)).date()
+
+        windows = []
+        for window_from, window_to in self.grid_windows(date_start, date_end):
+            seen = (window_from, window_to) in synced
+            if seen and window_to < settled_before:
+                continue
+            dates = (window_from.strftime(DATE_FORMAT), window_to.strftime(DATE_FORMAT))
+            windows.append((dates, seen))
+
+        return windows
+
+    def grid_windows(self, date_start, date_end):
+        # Grid windows overlapping date_start..date_end, as (from, to) dates
+        start = datetime.strptime(date_start, DATE_FORMAT).date()
+        end = datetime.strptime(date_end, DATE_FORMAT).date()
+        size = timedelta(days=self.window_days)
+
+        offset = (start - GRID_ORIGIN).days // self.window_days
+        window_from = GRID_ORIGIN + offset * size
+
+        windows = []
+        while window_from <= end:
+            windows.append((window_from, window_from + size - timedelta(days=1)))
+            window_from += size
+
+        return windows
+
+    def updated_timestamps(self, column: pd.Series):
+        # Native datetime64 columns, or "%Y%m%d%H%M%S" strings in legacy mode
+        if pd.api.types.is_datetime64_any_dtype(column):
+            updated = column
+        else:
+            updated = pd.to_datetime(
+                column, errors="coerce", format="%Y%m%d%H%M%S"
+            ).dt.tz_localize("EST")
+
+        return updated.dt.tz_convert("UTC")
+
+    def get_watermark(self, cls: str):
+        row = self.db.execute(
+            "select updated from wsh_watermarks where cls = ?", [cls]
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return pd.Timestamp(row[0]).tz_convert("UTC")
+
+    def set_watermark(self, cls: str, updated: pd.Timestamp):
+        self.db.execute(
+            "insert or replace into wsh_watermarks values (?, ?)",
+            [cls, updated.to_pydatetime()],
+        )
+
+    def mark_synced(self, cls: str, dates):
+        self.db.execute(
+            "insert or replace into wsh_windows values (?, ?, ?, now())",
+            [
+                cls,
+                datetime.strptime(dates[0], DATE_FORMAT).date(),
+                datetime.strptime(dates[1], DATE_FORMAT).date(),
+            ],
+        )
+
+    def upsert(self, cls: str, df: pd.DataFrame):
+        table = self.table_name(cls)
+        self.db.register("batch", df)
+        try:
+            self.db.execute(
+                f"create table if not exists {table} as select * from batch limit 0"
+            )
+            self.db.execute(
+                f"delete from {table} where event_id in (select event_id from batch)"
+            )
+            self.db.execute(f"insert into {table} by name select * from batch")
+        finally:
+            self.db.unregister("batch")
+
+    def load(self, cls: str) -> pd.DataFrame:
+        return self.db.execute(f"select * from {self.table_name(cls)}").df()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+import json
+import os
+
+DATE_FORMAT = "%m/%d/%Y"
+HISTORY_FILENAME = "wsh_window_history.json"
+
+
+class WindowPlanner:
+    # Picks WSH request windows per class from the observed response size per
+    # day. Dense periods get shorter windows so each response stays under
+    # max_bytes, sparse periods are merged into windows up to max_days long.
+    def __init__(
+        self,
+        max_bytes=5_000_000,
+        min_days=1,
+        max_days=90,
+        default_days=7,
+        smoothing=0.5,
+        history_file=None,
+    ):
+        self.max_bytes = max_bytes
+        self.min_days = min_days
+        self.max_days = max_days
+        self.default_days = default_days
+        self.smoothing = smoothing
+        self.history_file = history_file
+        self.bytes_per_day = self.load_history()
+
+    def load_history(self):
+        history = {}
+        if self.history_file and os.path.exists(self.history_file):
+            with open(self.history_file, "r") as f:
+                history = json.load(f)
+        return history
+
+    def save_history(self):
+        if self.history_file:
+            with open(self.history_file, "w") as f:
+                json.dump(self.bytes_per_day, f)
+
+    def window_days(self, cls: str) -> int:
+        density = self.bytes_per_day.get(cls)
+        if density is None:
+            return self.default_days
+
+        if density <= 0:
+            return self.max_days
+
+        days = int(self.max_bytes // density)
+        return max(self.min_days, min(days, self.max_days))
+
+    def record(self, cls: str, dates, response_size: int):
+        start = datetime.strptime(dates[0], DATE_FORMAT)
+        end = datetime.strptime(dates[1], DATE_FORMAT)
+        days = (end - start).days + 1
+
+        observed = response_size / days
+        previous = self.bytes_per_day.get(cls)
+        if previous is None:
+            self.bytes_per_day[cls] = observed
+        else:
+            # Exponential moving average, recent windows weigh more
+            self.bytes_per_day[cls] = (
+                self.smoothing * observed + (1 - self.smoothing) * previous
+            )
+
+        self.save_history()
+
+    # Windows are yielded lazily so each one is sized from the responses
+    # recorded so far
+    def windows(self, cls: str, start_date: str, end_date: str):
+        interval_start = datetime.strptime(start_date, DATE_FORMAT)
+        end_date = datetime.strptime(end_date, DATE_FORMAT)
+
+        while interval_start <= end_date:
+            days = self.window_days(cls)
+            interval_end = min(interval_start + timedelta(days=days - 1), end_date)
+            yield (
+                interval_start.strftime(DATE_FORMAT),
+                interval_end.strftime(DATE_FORMAT),
+            )
+            interval_start = interval_end + timedelta(days=1)
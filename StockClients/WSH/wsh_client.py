@@ -1,24 +1,59 @@
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List
+import threading
 import requests
 import urllib
 import xml.etree.ElementTree as ET
 import os
 import json
 import pandas as pd
+from ..output import PANDAS, check_format, convert_frame
+from ..singleflight import SingleFlight
+from .spill import ParquetSpill
+from .. import trading_calendar
 
 # For testing, cache responses to avoid hitting the API limit
 CACHE_FILENAME = "cache.json"
+# Conservative limit, most servers and proxies accept at least this much
+MAX_URL_LENGTH = 2000
+# Parsed responses waiting in a ParsePool before they're spilled to disk
+MAX_PENDING = 8
 DateTime2_format = "%m/%d/%Y"
+DateTime_format = "%m/%d/%Y %I:%M:%S %p"
 
 
 class WSHClient:
-    def __init__(self, customer_id, password, cache=False):
+    def __init__(
+        self,
+        customer_id,
+        password,
+        cache=False,
+        string_dates=False,
+        output_format=PANDAS,
+        flights: SingleFlight = None,
+        archive=None,
+        symbol_table=None,
+    ):
         self.customer_id = customer_id
         self.password = password
         self.base_url = "https://enchilada.wallstreethorizon.com/webservice6.asp?"
         self.cache = cache
+        # Legacy mode, dates as "%Y%m%d" / "%Y%m%d%H%M%S" strings instead of
+        # tz-aware datetime64 columns
+        self.string_dates = string_dates
+        self.output_format = check_format(output_format)
+        self.cache_lock = threading.Lock()
+        # Identical concurrent requests share one fetch and parse. Keys leave out
+        # client settings (symbol table, archive, errors), so only clients
+        # configured alike should share a SingleFlight
+        self.flights = flights if flights is not None else SingleFlight()
+        # Optional ResponseArchive for raw bodies
+        self.archive = archive
+        # Optional SymbolTable, adds a symbol_id column and registers
+        # company_id and isin as aliases
+        self.symbol_table = symbol_table
 
     def base_params(self):
         return {
@@ -26,33 +61,217 @@ class WSHClient:
             "p": self.password,
         }
 
-    def run_query(self, classes: List[str], date_start, date_end, stock_symbols="*"):
+    def run_query(
+        self,
+        classes: List[str],
+        date_start,
+        date_end,
+        stock_symbols="*",
+        parse_pool=None,
+        planner=None,
+        out_dir=None,
+        buffer_rows=100_000,
+        trading_days=False,
+    ):
         # WSH Only allows one class per request if stock_symbols is *,
         # so we need to make multiple requests and combine the results
         dfs = defaultdict(list)
-        date_range = self.split_date_range(date_start, date_end)
+        # With out_dir, frames are spilled to Parquet per class as they are
+        # parsed and a SpilledResult is returned instead of DataFrames
+        spill = ParquetSpill(out_dir, buffer_rows) if out_dir else None
+
+        def collect(parsed_dfs):
+            for parsed_class in parsed_dfs:
+                if spill is not None:
+                    spill.append(parsed_class, parsed_dfs[parsed_class])
+                else:
+                    dfs[parsed_class].append(parsed_dfs[parsed_class])
+
+        # Optional ParsePool, responses are parsed in worker processes while
+        # the remaining windows are fetched
+        pending = deque()
+
+        planned = self.plan_requests(
+            classes, date_start, date_end, planner, trading_days
+        )
+        for cls, dates in planned:
+            # With a planner, oversized responses are re-requested as halves
+            if planner is not None:
+                responses = self.fetch_window(cls, dates, stock_symbols, planner)
+            else:
+                responses = [(dates, None)]
+
+            for dates, data in responses:
+                url = self.build_url(cls, dates, stock_symbols)
+                if parse_pool is not None:
+                    if data is None:
+                        data = self.send_request(url)
+                    future = parse_pool.submit(
+                        "wsh", data, string_dates=self.string_dates
+                    )
+                    pending.append(future)
+                elif data is None:
+                    collect(self.request_parsed(url)[1])
+                else:
+                    collect(self.parse_response(data))
 
-        for dates in date_range:
-            for cls in classes:
-                params = self.base_params()
-                params["stock_symbols"] = stock_symbols
-                params["classes"] = cls
+                # Don't let parsed results pile up when spilling
+                while spill is not None and len(pending) > MAX_PENDING:
+                    collect(self.seed_symbols(pending.popleft().result()))
 
-                params["from"] = dates[0]
-                params["to"] = dates[1]
+        while pending:
+            collect(self.seed_symbols(pending.popleft().result()))
 
-                params["v"] = "3"
-                params["o"] = "EVENTS,EMPTY_TAGS"
+        if spill is not None:
+            return spill.close()
 
-                url = self.base_url + urllib.parse.urlencode(params)
-                data = self.send_request(url)
-                parsed_dfs = self.parse_response(data)
+        merged_dfs = self.merge_class_dfs(dfs)
+        return self.format_output(merged_dfs)
 
+    # Query exactly one window, one request per class, for callers that plan
+    # the windows themselves (the cli's wsh_window jobs)
+    def query_window(self, classes: List[str], dates, stock_symbols="*"):
+        dfs = defaultdict(list)
+        for cls in classes:
+            url = self.build_url(cls, dates, stock_symbols)
+            for parsed_class, df in self.request_parsed(url)[1].items():
+                dfs[parsed_class].append(df)
+
+        merged_dfs = self.merge_class_dfs(dfs)
+        return self.format_output(merged_dfs)
+
+    # Query a watchlist with explicit symbols. WSH allows multiple classes per
+    # request when symbols are listed, so the watchlist is split into chunks
+    # that keep the URL under max_url_length and each chunk requests every
+    # class at once. Chunks are fetched concurrently.
+    def run_watchlist_query(
+        self,
+        classes: List[str],
+        date_start,
+        date_end,
+        symbols: List[str],
+        max_url_length=MAX_URL_LENGTH,
+        max_workers=4,
+    ):
+        cls = ",".join(classes)
+        chunks = self.chunk_symbols(symbols, cls, max_url_length)
+        urls = [
+            self.build_url(cls, dates, ",".join(chunk))
+            for dates in self.split_date_range(date_start, date_end)
+            for chunk in chunks
+        ]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = executor.map(self.request_parsed, urls)
+
+            dfs = defaultdict(list)
+            for _, parsed_dfs in responses:
                 for parsed_class in parsed_dfs:
                     dfs[parsed_class].append(parsed_dfs[parsed_class])
 
         merged_dfs = self.merge_class_dfs(dfs)
-        return merged_dfs
+        return self.format_output(merged_dfs)
+
+    def chunk_symbols(self, symbols: List[str], cls: str, max_url_length):
+        # Length of a request URL with no symbols, dates are fixed width
+        base_length = len(self.build_url(cls, ("01/01/2000", "01/01/2000"), ""))
+
+        chunks = []
+        chunk = []
+        length = base_length
+        for symbol in dict.fromkeys(s.strip().upper() for s in symbols):
+            if not symbol:
+                continue
+
+            # Encoded symbol plus an encoded comma separator
+            symbol_length = len(urllib.parse.quote_plus(symbol)) + 3
+            if chunk and length + symbol_length > max_url_length:
+                chunks.append(chunk)
+                chunk = []
+                length = base_length
+
+            chunk.append(symbol)
+            length += symbol_length
+
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
+
+    # Fetch and parse a url, shared with concurrent callers of the same url
+    def request_parsed(self, url: str):
+        def fetch():
+            data = self.send_request(url)
+            return data, self.parse_response(data)
+
+        return self.flights.do(self.request_key(url), fetch)
+
+    # Pool workers parse without the symbol table, IDs are assigned here so
+    # there's one table for every process
+    def seed_symbols(self, parsed_dfs):
+        if self.symbol_table is not None:
+            for df in parsed_dfs.values():
+                df["symbol_id"] = self.symbol_table.seed_wsh(df)
+        return parsed_dfs
+
+    def request_key(self, url: str):
+        return ("wsh", url, self.string_dates)
+
+    def plan_requests(
+        self,
+        classes: List[str],
+        date_start,
+        date_end,
+        planner=None,
+        trading_days=False,
+    ):
+        # Fixed 7 day windows, unless a WindowPlanner sizes them per class
+        if planner is None:
+            date_range = self.split_date_range(
+                date_start, date_end, trading_days=trading_days
+            )
+            for dates in date_range:
+                for cls in classes:
+                    yield cls, dates
+            return
+
+        for cls in classes:
+            for dates in planner.windows(cls, date_start, date_end):
+                yield cls, dates
+
+    # Fetch a planned window, splitting it in halves while the response is
+    # over the planner's max_bytes, down to single days
+    def fetch_window(self, cls: str, dates, stock_symbols, planner):
+        data = self.send_request(self.build_url(cls, dates, stock_symbols))
+        planner.record(cls, dates, len(data))
+
+        start = datetime.strptime(dates[0], "%m/%d/%Y")
+        end = datetime.strptime(dates[1], "%m/%d/%Y")
+        if len(data) <= planner.max_bytes or start >= end:
+            yield dates, data
+            return
+
+        del data
+        middle = start + timedelta(days=(end - start).days // 2)
+        halves = [
+            (dates[0], middle.strftime("%m/%d/%Y")),
+            ((middle + timedelta(days=1)).strftime("%m/%d/%Y"), dates[1]),
+        ]
+        for half in halves:
+            yield from self.fetch_window(cls, half, stock_symbols, planner)
+
+    def build_url(self, cls: str, dates, stock_symbols="*"):
+        params = self.base_params()
+        params["stock_symbols"] = stock_symbols
+        params["classes"] = cls
+
+        params["from"] = dates[0]
+        params["to"] = dates[1]
+
+        params["v"] = "3"
+        params["o"] = "EVENTS,EMPTY_TAGS"
+
+        return self.base_url + urllib.parse.urlencode(params)
 
     def load_cache(self):
         cache = {}
@@ -63,19 +282,30 @@ class WSHClient:
 
     # Send request, or return cached response if available
     def send_request(self, url: str):
-        cache = {}
         if self.cache:
-            cache = self.load_cache()
+            with self.cache_lock:
+                cache = self.load_cache()
             if url in cache:
                 return cache[url]
 
         res = requests.get(url)
+        res.raise_for_status()
+
+        if self.archive is not None and res.status_code == 200:
+            self.archive.put("wsh", res.text, {"url": url})
 
         if self.cache:
             if res.status_code == 200:
-                cache[url] = res.text
-                with open(CACHE_FILENAME, "w") as f:
-                    json.dump(cache, f)
+                # Requests may run concurrently, re-read under the lock so
+                # other threads' entries aren't overwritten
+                with self.cache_lock:
+                    cache = self.load_cache()
+                    cache[url] = res.text
+                    # Readers in other processes never see a partial file
+                    tmp = f"{CACHE_FILENAME}.{os.getpid()}.tmp"
+                    with open(tmp, "w") as f:
+                        json.dump(cache, f)
+                    os.replace(tmp, CACHE_FILENAME)
 
         return res.text
 
@@ -117,9 +347,10 @@ class WSHClient:
             df["updated"] = df["updated"].str.decode("utf-8")
             df["return_time"] = df["return_time"].str.decode("utf-8")
 
-            self.convert_datetime2(df, "created")
-            self.convert_datetime2(df, "updated")
-            self.convert_datetime2(df, "return_time")
+            self.convert_datetime_columns(df, ["created", "updated", "return_time"])
+
+            if self.symbol_table is not None:
+                df["symbol_id"] = self.symbol_table.seed_wsh(df)
 
             # Class-specific data frame columns
             if cls == "db":
@@ -150,13 +381,18 @@ class WSHClient:
                     }
                 )
 
-                self.convert_date(df, "prior_earnings_date")
-                self.convert_date(df, "earnings_date")
-                self.convert_date(df, "quarter_end_date")
-                self.convert_date(df, "prelim_earnings_date")
-                self.convert_date(df, "option_expiration_date")
-                self.convert_date(df, "filing_due_date")
-                # self.convert_date(df, "announce_datetime") # API v4 only
+                self.convert_date_columns(
+                    df,
+                    [
+                        "prior_earnings_date",
+                        "earnings_date",
+                        "quarter_end_date",
+                        "prelim_earnings_date",
+                        "option_expiration_date",
+                        "filing_due_date",
+                        # "announce_datetime", # API v4 only
+                    ],
+                )
             elif cls == "ed":
                 df = df.astype(
                     {
@@ -175,10 +411,15 @@ class WSHClient:
                         "disclaimer": str,
                     }
                 )
-                self.convert_date(df, "earnings_date")
-                self.convert_date(df, "prelim_earnings_date")
-                self.convert_date(df, "quarter_end_date")
-                self.convert_date(df, "filing_due_date")
+                self.convert_date_columns(
+                    df,
+                    [
+                        "earnings_date",
+                        "prelim_earnings_date",
+                        "quarter_end_date",
+                        "filing_due_date",
+                    ],
+                )
 
             dfs[cls] = df
 
@@ -193,6 +434,12 @@ class WSHClient:
             
         return merged_dataframes
 
+    def format_output(self, dataframes: Dict[str, pd.DataFrame]):
+        return {
+            cls: convert_frame(df, self.output_format)
+            for cls, df in dataframes.items()
+        }
+
     # def merge_class_dfs(self, dataframes: Dict[str, List[pd.DataFrame]]):
     #     common_cols = [
     #         "event_id",
@@ -229,21 +476,60 @@ class WSHClient:
     #     return df_final
 
     def convert_datetime2(self, df, column, tz="EST"):
-        df[column] = pd.to_datetime(
-            df[column], errors="coerce", format="%m/%d/%Y %H:%M:%S %p"
-        )
-        df[column] = df[column].dt.tz_localize(tz)
-        df[column] = df[column].dt.strftime("%Y%m%d%H%M%S")
+        self.convert_datetime_columns(df, [column], tz)
 
     def convert_date(self, df, column, tz="EST"):
-        df[column] = pd.to_datetime(df[column], errors="coerce", format="%m/%d/%Y")
-        df[column] = df[column].dt.tz_localize(tz)
-        df[column] = df[column].dt.strftime("%Y%m%d")
+        self.convert_date_columns(df, [column], tz)
+
+    def convert_datetime_columns(self, df, columns: List[str], tz="EST"):
+        self.convert_columns(df, columns, DateTime_format, True, tz)
+
+    def convert_date_columns(self, df, columns: List[str], tz="EST"):
+        self.convert_columns(df, columns, DateTime2_format, False, tz)
+
+    # Parse all date columns of a class in one pass. The columns are stacked
+    # into a single Series so pd.to_datetime runs once with its unique-value
+    # cache, then split back into the original columns.
+    def convert_columns(self, df, columns: List[str], fmt, with_time, tz="EST"):
+        columns = [column for column in columns if column in df.columns]
+        if len(columns) == 0:
+            return
+
+        n = len(df)
+        stacked = pd.concat([df[column] for column in columns], ignore_index=True)
+        parsed = pd.to_datetime(stacked, errors="coerce", format=fmt, cache=True)
+
+        if self.string_dates:
+            parsed = self.format_compact(parsed, with_time)
+        else:
+            parsed = parsed.dt.tz_localize(tz)
+
+        for i, column in enumerate(columns):
+            df[column] = parsed.iloc[i * n : (i + 1) * n].set_axis(df.index)
+
+    # Vectorized equivalent of strftime("%Y%m%d") / strftime("%Y%m%d%H%M%S")
+    def format_compact(self, parsed: pd.Series, with_time: bool):
+        values = parsed.dt.year * 10000 + parsed.dt.month * 100 + parsed.dt.day
+        if with_time:
+            values = (
+                values * 1000000
+                + parsed.dt.hour * 10000
+                + parsed.dt.minute * 100
+                + parsed.dt.second
+            )
 
-    def split_date_range(self, start_date, end_date, max_days=7):
+        valid = parsed.notna()
+        out = pd.Series(None, index=parsed.index, dtype=object)
+        out[valid] = values[valid].astype("int64").astype(str)
+        return out
+
+    def split_date_range(self, start_date, end_date, max_days=7, trading_days=False):
         start_date = datetime.strptime(start_date, "%m/%d/%Y")
         end_date = datetime.strptime(end_date, "%m/%d/%Y")
 
+        if trading_days:
+            return self.split_trading_days(start_date, end_date, max_days)
+
         interval_start = start_date
         intervals = []
 
@@ -257,3 +543,22 @@ class WSHClient:
             )  # start next interval on next day
 
         return intervals
+
+    # Windows of max_days + 1 trading days. Weekends and holidays between
+    # trading days stay inside a window but don't count towards its size,
+    # leading and trailing ones are skipped.
+    def split_trading_days(self, start_date, end_date, max_days=7):
+        days = trading_calendar.trading_days(start_date, end_date)
+
+        intervals = []
+        interval_start = None
+        for i in range(0, len(days), max_days + 1):
+            chunk = days[i : i + max_days + 1]
+            if interval_start is None:
+                interval_start = chunk[0]
+            intervals.append(
+                (interval_start.strftime("%m/%d/%Y"), chunk[-1].strftime("%m/%d/%Y"))
+            )
+            interval_start = chunk[-1] + timedelta(days=1)
+
+        return intervals
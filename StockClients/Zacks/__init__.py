@@ -1,2 +1,23 @@
-from .scraper import ZacksScraper
-from .earnings_calendar import EarningsCalendarTab
\ No newline at end of file
+import importlib
+
+lazy_attributes = {
+    "ZacksScraper": ".scraper",
+    "EarningsCalendarTab": ".earnings_calendar",
+    "CookieStore": ".cookie_store",
+    "ScreenSnapshot": ".screen_snapshot",
+    "ScreenHistory": ".screen_history",
+}
+
+
+def __getattr__(name):
+    if name in lazy_attributes:
+        module = importlib.import_module(lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(lazy_attributes))
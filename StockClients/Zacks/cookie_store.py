@@ -0,0 +1,168 @@
+from contextlib import contextmanager
+from http.cookiejar import Cookie
+import json
+import os
+import time
+
+import requests
+
+# Encrypted on-disk cookie jar shared between processes, so short-lived
+# workers can reuse a logged-in Zacks session instead of logging in again.
+# Cookies are encrypted with Fernet (pip install cryptography), writes are
+# atomic and serialized with a lock file.
+
+# Cookies without an expiry are trusted for this long after being saved
+SESSION_TTL = 12 * 60 * 60
+# A restored session is checked against the server again after this long
+VERIFY_INTERVAL = 15 * 60
+
+
+class CookieStore:
+    def __init__(
+        self,
+        path: str,
+        key: bytes,
+        session_ttl=SESSION_TTL,
+        verify_interval=VERIFY_INTERVAL,
+    ):
+        from cryptography.fernet import Fernet
+
+        self.path = path
+        self.fernet = Fernet(key)
+        self.session_ttl = session_ttl
+        self.verify_interval = verify_interval
+        # When the last loaded session was last verified
+        self.verified_at = None
+
+    @staticmethod
+    def generate_key() -> bytes:
+        from cryptography.fernet import Fernet
+
+        return Fernet.generate_key()
+
+    @contextmanager
+    def locked(self):
+        with open(self.path + ".lock", "a") as lock:
+            try:
+                import fcntl
+
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            except ImportError:
+                # No flock on Windows, writes are still atomic
+                pass
+            yield
+
+    # read_state and write_state expect the caller to hold the lock
+    def read_state(self):
+        from cryptography.fernet import InvalidToken
+
+        # Another worker can clear the store at any time
+        try:
+            with open(self.path, "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            return json.loads(self.fernet.decrypt(token))
+        except (InvalidToken, ValueError):
+            return None
+
+    def write_state(self, state):
+        token = self.fernet.encrypt(json.dumps(state).encode("utf-8"))
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(token)
+        os.replace(tmp, self.path)
+
+    def save(self, cookies: requests.cookies.RequestsCookieJar):
+        # Only verified logins are saved
+        now = time.time()
+        state = {
+            "saved_at": now,
+            "verified_at": now,
+            "cookies": [
+                {
+                    "name": c.name,
+                    "value": c.value,
+                    "domain": c.domain,
+                    "path": c.path,
+                    "secure": c.secure,
+                    "expires": c.expires,
+                }
+                for c in cookies
+            ],
+        }
+
+        with self.locked():
+            self.write_state(state)
+        self.verified_at = now
+
+    def load(self):
+        # Returns the unexpired cookies, or None if there's no usable session
+        with self.locked():
+            state = self.read_state()
+        if state is None:
+            return None
+
+        now = time.time()
+        session_expires = state["saved_at"] + self.session_ttl
+        cookies = [
+            c
+            for c in state["cookies"]
+            if (c["expires"] or session_expires) > now
+        ]
+        if len(cookies) == 0:
+            return None
+
+        self.verified_at = state.get("verified_at", 0)
+        return cookies
+
+    def needs_verification(self):
+        if self.verified_at is None:
+            return True
+        return time.time() - self.verified_at > self.verify_interval
+
+    def mark_verified(self):
+        # Lets the other workers skip verification until the interval is up
+        now = time.time()
+        with self.locked():
+            state = self.read_state()
+            if state is not None:
+                state["verified_at"] = now
+                self.write_state(state)
+        self.verified_at = now
+
+    def restore(self, session: requests.Session):
+        cookies = self.load()
+        if cookies is None:
+            return False
+
+        for c in cookies:
+            session.cookies.set_cookie(
+                Cookie(
+                    version=0,
+                    name=c["name"],
+                    value=c["value"],
+                    port=None,
+                    port_specified=False,
+                    domain=c["domain"],
+                    domain_specified=bool(c["domain"]),
+                    domain_initial_dot=c["domain"].startswith("."),
+                    path=c["path"],
+                    path_specified=True,
+                    secure=c["secure"],
+                    expires=c["expires"],
+                    discard=c["expires"] is None,
+                    comment=None,
+                    comment_url=None,
+                    rest={},
+                )
+            )
+        return True
+
+    def clear(self):
+        with self.locked():
+            if os.path.exists(self.path):
+                os.remove(self.path)
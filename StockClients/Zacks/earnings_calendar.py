@@ -2,8 +2,8 @@ import requests
 from enum import Enum
 from datetime import datetime
 import json
-import pandas as pd
-from bs4 import BeautifulSoup
+from ..errors import ErrorCollector
+from ..output import PANDAS, build_frame, check_format
 
 
 class EarningsCalendarTab(Enum):
@@ -33,14 +33,88 @@ class EarningsCalendarTab(Enum):
     TRANSCRIPTS = 8
 
 
+earnings_columns = [
+    "symbol",
+    "company",
+    "mcap",
+    "time",
+    "estimate",
+    "reported",
+    "surprise",
+    "percent_surprise",
+    "percent_price_change",
+]
+
+guidance_columns = [
+    "symbol",
+    "company",
+    "mcap",
+    "period",
+    "period_end",
+    "guid_range",
+    "mid_guid",
+    "cons",
+    "percent_to_high_point",
+]
+
+revisions_columns = [
+    "symbol",
+    "company",
+    "mcap",
+    "period",
+    "period_end",
+    "old",
+    "new",
+    "est_change",
+    "cons",
+    "new_est_vs_cons",
+]
+
+dividends_columns = [
+    "symbol",
+    "company",
+    "mcap",
+    "amount",
+    "yield",
+    "ex_div_date",
+    "current_price",
+    "payable_date",
+]
+
+splits_columns = [
+    "symbol",
+    "company",
+    "mcap",
+    "price",
+    "split_factor",
+]
+
+
 class EarningsCalendarScraper:
-    def __init__(self, session: requests.Session):
+    def __init__(
+        self,
+        session: requests.Session,
+        output_format=PANDAS,
+        errors: ErrorCollector = None,
+        archive=None,
+        symbol_table=None,
+    ):
         self.session = session
+        self.archive = archive
+        # Optional SymbolTable, adds a symbol_id column
+        self.symbol_table = symbol_table
+        self.output_format = check_format(output_format)
+        # Rows that fail to parse are recorded here instead of printed
+        self.errors = errors if errors is not None else ErrorCollector()
 
     def scrape(self, tab: EarningsCalendarTab, dt: datetime):
         response = self.fetch_tab(tab, dt)
 
         df = self.parse_tab(response, tab)
+        if self.symbol_table is not None and df is not None:
+            from ..symbols import add_symbol_ids
+
+            df = add_symbol_ids(df, "symbol", self.symbol_table)
         return df
 
     def fetch_tab(self, tab: EarningsCalendarTab, dt: datetime):
@@ -51,9 +125,14 @@ class EarningsCalendarScraper:
         url += f"&_={int(datetime.now().timestamp())}"
 
         response = self.session.get(url)
-        if not response.ok:
-            raise Exception(
-                f"Error fetching tab {tab} for date {dt.ctime()}: status code {response.status_code}"
+        # HTTPError, so the Orchestrator retries 429 and 5xx responses
+        response.raise_for_status()
+
+        if self.archive is not None:
+            self.archive.put(
+                "zacks_calendar",
+                response.text,
+                {"url": url, "tab": tab.name, "date": int(dt.timestamp())},
             )
 
         return response.text
@@ -88,31 +167,23 @@ class EarningsCalendarScraper:
                 return self.parse_splits_tab(data)
 
     def parse_earnings_tab(self, data):
-        df = pd.DataFrame(
-            columns=[
-                "symbol",
-                "company",
-                "mcap",
-                "time",
-                "estimate",
-                "reported",
-                "surprise",
-                "percent_surprise",
-                "percent_price_change",
-            ]
-        )
+        context = "calendar_earnings"
+        self.errors.seen(context, len(data))
 
+        rows = []
         for row in data:
             try:
-                newRow = self.parse_earnings_row(row)
-                df = pd.concat([df, newRow], ignore_index=True)
+                rows.append(self.parse_earnings_row(row))
             except Exception as e:
-                print(f"Error parsing row: {row}")
-                print(e)
+                self.errors.record(context, row, e)
 
-        return df
+        self.errors.check(context, len(data), len(data) - len(rows))
+        return build_frame(rows, earnings_columns, self.output_format)
 
     def parse_earnings_row(self, row):
+        # bs4 is only imported once rows are parsed
+        from bs4 import BeautifulSoup
+
         parsedData = {}
 
         # Index 0: Symbolƒ
@@ -137,36 +208,25 @@ class EarningsCalendarScraper:
         # parsedData["percent_surprise"] = row[7]
         # parsedData["percent_price_change"] = row[8]
 
-        newRow = pd.Series(data=parsedData)
-        newRow = newRow.to_frame().transpose()
-        return newRow
+        return parsedData
 
     def parse_guidance_tab(self, data):
-        df = pd.DataFrame(
-            columns=[
-                "symbol",
-                "company",
-                "mcap",
-                "period",
-                "period_end",
-                "guid_range",
-                "mid_guid",
-                "cons",
-                "percent_to_high_point",
-            ]
-        )
+        context = "calendar_guidance"
+        self.errors.seen(context, len(data))
 
+        rows = []
         for row in data:
             try:
-                newRow = self.parse_guidance_row(row)
-                df = pd.concat([df, newRow], ignore_index=True)
+                rows.append(self.parse_guidance_row(row))
             except Exception as e:
-                print(f"Error parsing guidance row: {row}")
-                print(e)
+                self.errors.record(context, row, e)
 
-        return df
+        self.errors.check(context, len(data), len(data) - len(rows))
+        return build_frame(rows, guidance_columns, self.output_format)
 
     def parse_guidance_row(self, row):
+        from bs4 import BeautifulSoup
+
         parsedData = {}
 
         # Index 0: Symbol
@@ -188,37 +248,25 @@ class EarningsCalendarScraper:
         parsedData["cons"] = row[7]
         parsedData["percent_to_high_point"] = row[8]
 
-        newRow = pd.Series(data=parsedData)
-        newRow = newRow.to_frame().transpose()
-        return newRow
+        return parsedData
 
     def parse_revisions_tab(self, data):
-        df = pd.DataFrame(
-            columns=[
-                "symbol",
-                "company",
-                "mcap",
-                "period",
-                "period_end",
-                "old",
-                "new",
-                "est_change",
-                "cons",
-                "new_est_vs_cons",
-            ]
-        )
+        context = "calendar_revisions"
+        self.errors.seen(context, len(data))
 
+        rows = []
         for row in data:
             try:
-                newRow = self.parse_revisions_row(row)
-                df = pd.concat([df, newRow], ignore_index=True)
+                rows.append(self.parse_revisions_row(row))
             except Exception as e:
-                print(f"Error parsing revisions row: {row}")
-                print(e)
+                self.errors.record(context, row, e)
 
-        return df
+        self.errors.check(context, len(data), len(data) - len(rows))
+        return build_frame(rows, revisions_columns, self.output_format)
 
     def parse_revisions_row(self, row):
+        from bs4 import BeautifulSoup
+
         parsedData = {}
 
         # Index 0: Symbol
@@ -247,35 +295,25 @@ class EarningsCalendarScraper:
         texts = soup.findAll(text=True, recursive=True)
         parsedData["new_est_vs_cons"] = texts[0]
 
-        newRow = pd.Series(data=parsedData)
-        newRow = newRow.to_frame().transpose()
-        return newRow
+        return parsedData
 
     def parse_dividends_tab(self, data):
-        df = pd.DataFrame(
-            columns=[
-                "symbol",
-                "company",
-                "mcap",
-                "amount",
-                "yield",
-                "ex_div_date",
-                "current_price",
-                "payable_date",
-            ]
-        )
+        context = "calendar_dividends"
+        self.errors.seen(context, len(data))
 
+        rows = []
         for row in data:
             try:
-                newRow = self.parse_dividends_row(row)
-                df = pd.concat([df, newRow], ignore_index=True)
+                rows.append(self.parse_dividends_row(row))
             except Exception as e:
-                print(f"Error parsing dividends row: {row}")
-                print(e)
+                self.errors.record(context, row, e)
 
-        return df
+        self.errors.check(context, len(data), len(data) - len(rows))
+        return build_frame(rows, dividends_columns, self.output_format)
 
     def parse_dividends_row(self, row):
+        from bs4 import BeautifulSoup
+
         parsedData = {}
 
         # Index 0: Symbol
@@ -295,32 +333,25 @@ class EarningsCalendarScraper:
         parsedData["current_price"] = row[6]
         parsedData["payable_date"] = row[7]
 
-        newRow = pd.Series(data=parsedData)
-        newRow = newRow.to_frame().transpose()
-        return newRow
+        return parsedData
 
     def parse_splits_tab(self, data):
-        df = pd.DataFrame(
-            columns=[
-                "symbol",
-                "company",
-                "mcap",
-                "price",
-                "split_factor",
-            ]
-        )
+        context = "calendar_splits"
+        self.errors.seen(context, len(data))
 
+        rows = []
         for row in data:
             try:
-                newRow = self.parse_splits_row(row)
-                df = pd.concat([df, newRow], ignore_index=True)
+                rows.append(self.parse_splits_row(row))
             except Exception as e:
-                print(f"Error parsing splits row: {row}")
-                print(e)
+                self.errors.record(context, row, e)
 
-        return df
+        self.errors.check(context, len(data), len(data) - len(rows))
+        return build_frame(rows, splits_columns, self.output_format)
 
     def parse_splits_row(self, row):
+        from bs4 import BeautifulSoup
+
         parsedData = {}
 
         # Index 0: Symbol
@@ -337,6 +368,4 @@ class EarningsCalendarScraper:
         parsedData["price"] = row[3]
         parsedData["split_factor"] = row[4]
 
-        newRow = pd.Series(data=parsedData)
-        newRow = newRow.to_frame().transpose()
-        return newRow
+        return parsedData
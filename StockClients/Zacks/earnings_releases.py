@@ -2,8 +2,8 @@ import requests
 import enum
 import datetime
 import json
-from bs4 import BeautifulSoup
-import pandas as pd
+from ..errors import ErrorCollector
+from ..output import PANDAS, build_frame, check_format
 
 
 class EarningsReleaseTab(enum.Enum):
@@ -14,6 +14,15 @@ class EarningsReleaseTab(enum.Enum):
     MINUS_SALES_SURPRISE = 5
 
 
+# Which tabs to scrape, in the order they fill the records
+release_tabs = [
+    EarningsReleaseTab.ALL,
+    EarningsReleaseTab.PLUS_EARNINGS_SURPRISE,
+    EarningsReleaseTab.MINUS_EARNINGS_SURPRISE,
+    EarningsReleaseTab.PLUS_SALES_SURPRISE,
+    EarningsReleaseTab.MINUS_SALES_SURPRISE,
+]
+
 earnings_columns = {
     "ticker": "hticker",
     "report_time": "eatime",
@@ -28,58 +37,89 @@ sales_columns = {
     "reported": "sales_actual",
 }
 
+release_columns = [
+    "hticker",
+    "eadate",
+    "eatime",
+    "eps_est",
+    "eps_actual",
+    "sales_est",
+    "sales_actual",
+]
+
 
 class EarningsReleaseScraper:
-    def __init__(self, session: requests.Session):
+    def __init__(
+        self,
+        session: requests.Session,
+        output_format=PANDAS,
+        errors: ErrorCollector = None,
+        archive=None,
+        symbol_table=None,
+    ):
         self.session = session
+        self.archive = archive
+        # Optional SymbolTable, adds a symbol_id column
+        self.symbol_table = symbol_table
+        self.output_format = check_format(output_format)
+        # Rows that fail to parse are recorded here instead of printed
+        self.errors = errors if errors is not None else ErrorCollector()
 
     def scrape(self, timestamp: datetime.datetime):
-        # Which tabs to scrape
-        jobs = [
-            EarningsReleaseTab.ALL,
-            EarningsReleaseTab.PLUS_EARNINGS_SURPRISE,
-            EarningsReleaseTab.MINUS_EARNINGS_SURPRISE,
-            EarningsReleaseTab.PLUS_SALES_SURPRISE,
-            EarningsReleaseTab.MINUS_SALES_SURPRISE,
-        ]
-
-        earnings_df = pd.DataFrame()
-        sales_df = pd.DataFrame()
-
-        for job in jobs:
-            response = self.fetch_tab(job, timestamp)
-            parsed = self.parse_response(response)
-
-            # Rename columns based on which tab was scraped
+        bodies = {job: self.fetch_tab(job, timestamp) for job in release_tabs}
+        return self.assemble(bodies, timestamp)
+
+    # Build the day's releases from the raw tab bodies, also used to re-parse
+    # archived tabs
+    def assemble(self, bodies, timestamp: datetime.datetime):
+        # Rows keyed on (hticker, eatime). ALL is a superset of the earnings
+        # surprise tabs, so each key is filled once per field as tabs arrive
+        # instead of merging the overlapping tabs.
+        records = {}
+
+        for job in release_tabs:
+            if job not in bodies:
+                continue
+            rows = self.parse_rows(bodies[job])
+
+            # Fill columns based on which tab was scraped
             if (
                 job == EarningsReleaseTab.ALL
                 or job == EarningsReleaseTab.PLUS_EARNINGS_SURPRISE
                 or job == EarningsReleaseTab.MINUS_EARNINGS_SURPRISE
             ):
-                parsed = parsed.rename(columns=earnings_columns)
-                earnings_df = pd.concat([earnings_df, parsed], ignore_index=True)
+                self.fill_records(records, rows, earnings_columns)
 
             if (
                 job == EarningsReleaseTab.PLUS_SALES_SURPRISE
                 or job == EarningsReleaseTab.MINUS_SALES_SURPRISE
             ):
-                parsed = parsed.rename(columns=sales_columns)
-                sales_df = pd.concat([sales_df, parsed], ignore_index=True)
+                self.fill_records(records, rows, sales_columns)
 
-        # Merge results
-        df = pd.merge(earnings_df, sales_df, how="outer", on=["hticker", "eatime"])
-        df["eadate"] = timestamp.date().strftime("%Y%m%d")
+        eadate = timestamp.date().strftime("%Y%m%d")
+        for record in records.values():
+            record["eadate"] = eadate
 
-        # Rearrange columns
-        cols = df.columns.tolist()
-        cols.insert(1, cols.pop(cols.index("eadate")))
-        df = df[cols]
+        df = build_frame(list(records.values()), release_columns, self.output_format)
+        if self.symbol_table is not None:
+            from ..symbols import add_symbol_ids
 
-        # Dedupe
-        df = df.drop_duplicates()
+            df = add_symbol_ids(df, "hticker", self.symbol_table)
 
         return df
 
+    def fill_records(self, records, rows, columns):
+        for row in rows:
+            key = (row.get("ticker"), row.get("report_time"))
+            record = records.get(key)
+            if record is None:
+                record = {"hticker": key[0], "eatime": key[1]}
+                records[key] = record
+
+            for column, renamed in columns.items():
+                if column in row and record.get(renamed) is None:
+                    record[renamed] = row[column]
+
     def fetch_tab(self, tab: EarningsReleaseTab, timestamp: datetime.datetime):
         now = int(datetime.datetime.now().timestamp())
         timestampUnix = int(timestamp.timestamp())
@@ -88,6 +128,13 @@ class EarningsReleaseScraper:
         response = self.session.get(url)
         response.raise_for_status()
 
+        if self.archive is not None:
+            self.archive.put(
+                "zacks_release",
+                response.text,
+                {"url": url, "tab": tab.name, "timestamp": timestampUnix},
+            )
+
         return response.text
 
     def remove_last_bracket(self, s: str):
@@ -98,26 +145,48 @@ class EarningsReleaseScraper:
         return s
 
     def parse_response(self, response: str):
+        # Parse data into a DataFrame
+        rows = self.parse_rows(response)
+        df = build_frame(
+            rows,
+            ["ticker", "report_time", "estimate", "reported"],
+            self.output_format,
+        )
+
+        return df
+
+    def parse_rows(self, response: str):
         # Extract JSON data from JavaScript request body
         body = response.split('"data"  : ', 1)[1]
         body = self.remove_last_bracket(body)
         body = body.strip()
         data = json.loads(body)
 
-        # Parse data into a Pandas DataFrame
-        df = pd.DataFrame(columns=["ticker", "report_time", "estimate", "reported"])
+        context = "earnings_release"
+        self.errors.seen(context, len(data))
 
+        rows = []
         for row in data:
             try:
-                newRow = self.parseRow(row)
-                df = pd.concat([df, newRow], ignore_index=True)
+                rows.append(self.parse_row_data(row))
             except Exception as e:
-                print(f"Error parsing row: {row}")
-                print(e)
+                self.errors.record(context, row, e)
 
-        return df
+        self.errors.check(context, len(data), len(data) - len(rows))
+        return rows
 
     def parseRow(self, row):
+        import pandas as pd
+
+        parsedData = self.parse_row_data(row)
+
+        newRow = pd.Series(data=parsedData)
+        newRow = newRow.to_frame().transpose()
+        return newRow
+
+    def parse_row_data(self, row):
+        from bs4 import BeautifulSoup
+
         parsedData = {}
         for key in row:
             value = row[key]
@@ -139,8 +208,8 @@ class EarningsReleaseScraper:
                     try:
                         dt = datetime.datetime.strptime(value, "%H:%M")
                         parsedData["report_time"] = dt.time()
-                    except ValueError:
-                        print(f"Error parsing report_time: {value}")
+                    except ValueError as e:
+                        self.errors.record("earnings_release_time", value, e)
                         parsedData["report_time"] = None
                 case "estimate":
                     parsedData["estimate"] = value
@@ -155,6 +224,4 @@ class EarningsReleaseScraper:
                 #     texts = soup.findAll(text=True, recursive=True)
                 #     parsedData['percent_change'] = texts[0]
 
-        newRow = pd.Series(data=parsedData)
-        newRow = newRow.to_frame().transpose()
-        return newRow
+        return parsedData
@@ -3,7 +3,13 @@ from .stock_screener import StockScreener
 from .earnings_releases import EarningsReleaseScraper
 from .earnings_calendar import EarningsCalendarScraper, EarningsCalendarTab
 from typing import Any, Dict, List
-from datetime import datetime
+from datetime import datetime, time
+import json
+from ..output import PANDAS, check_format
+from ..singleflight import SingleFlight
+from ..errors import ErrorCollector
+from .. import trading_calendar
+from .cookie_store import CookieStore
 
 # Charles proxy config
 default_proxies = {
@@ -11,6 +17,11 @@ default_proxies = {
     "https": "http://localhost:8888",
 }
 
+# A failed login also returns 200, so success is checked for a session
+# cookie set by the login, or a marker only shown to logged-in users
+auth_cookies = ("CUSTOMER_ID", "zacks_user")
+login_markers = ("logout.php", "Sign Out")
+
 
 class ZacksScraper:
     def __init__(
@@ -19,12 +30,32 @@ class ZacksScraper:
         password,
         use_proxy=False,
         proxies: dict[str, str] = default_proxies,
+        output_format=PANDAS,
+        screen_output_format=None,
+        flights: SingleFlight = None,
+        errors: ErrorCollector = None,
+        cookie_store: CookieStore = None,
+        archive=None,
+        symbol_table=None,
     ):
         self.username = username
         self.password = password
         self.logged_in = False
         self.session = requests.Session()
         self.use_proxy = use_proxy
+        self.output_format = check_format(output_format)
+        self.screen_output_format = screen_output_format
+        # Identical concurrent requests share one fetch and parse. Keys leave out
+        # client settings (symbol table, archive, errors), so only clients
+        # configured alike should share a SingleFlight
+        self.flights = flights if flights is not None else SingleFlight()
+        # Parse failures of every scraper created by this client
+        self.errors = errors if errors is not None else ErrorCollector()
+        # Optional session shared across processes
+        self.cookie_store = cookie_store
+        # Optional ResponseArchive for raw bodies
+        self.archive = archive
+        self.symbol_table = symbol_table
 
         # Optional Charles proxy for debugging
         if use_proxy:
@@ -38,6 +69,17 @@ class ZacksScraper:
         )
 
     def login(self):
+        if not self.logged_in and self.restore_session():
+            if not self.cookie_store.needs_verification():
+                self.logged_in = True
+            elif self.verify_session():
+                self.logged_in = True
+                self.cookie_store.mark_verified()
+            else:
+                # Invalidated server side, don't hand it to other workers
+                self.cookie_store.clear()
+                self.session.cookies.clear()
+
         if not self.logged_in:
             login_url = "https://www.zacks.com"
 
@@ -54,27 +96,115 @@ class ZacksScraper:
             }
 
             response = self.session.post(login_url, headers=headers, params=params)
+            response.raise_for_status()
 
-            if response.status_code == 200:
-                self.logged_in = True
-                return None
-            else:
+            if response.status_code != 200:
                 raise Exception(f"Login status: {response.status_code}")
 
-    def run_stock_screen(self, config: List[Dict[str, Any]]):
+            if not self.is_authenticated(response):
+                raise Exception("Login failed: no authenticated session")
+
+            self.logged_in = True
+            if self.cookie_store is not None:
+                self.cookie_store.save(self.session.cookies)
+            return None
+
+    # Only verified logins are saved, and restored ones are checked with
+    # verify_session before use
+    def restore_session(self):
+        if self.cookie_store is None:
+            return False
+        return self.cookie_store.restore(self.session)
+
+    # Restored cookies can be dead on the server (logout elsewhere, password
+    # change) and still carry the auth cookie, so they're checked for a
+    # marker only logged-in pages show. The store records when a session was
+    # last checked, so workers only pay for this once per verify_interval.
+    def verify_session(self):
+        response = self.session.get("https://www.zacks.com")
+        response.raise_for_status()
+        return any(marker in response.text for marker in login_markers)
+
+    def has_auth_cookie(self):
+        return any(cookie.name in auth_cookies for cookie in self.session.cookies)
+
+    def is_authenticated(self, response: requests.Response):
+        if self.has_auth_cookie():
+            return True
+
+        text = response.text
+        return any(marker in text for marker in login_markers)
+
+    def run_stock_screen(self, config: List[Dict[str, Any]], snapshot=None):
+        # Evaluate locally against a ScreenSnapshot instead of screener-api
+        if snapshot is not None:
+            return snapshot.run(config)
+
         self.login()
 
-        screener = StockScreener(self.session)
-        return screener.run(config)
+        screener = StockScreener(
+            self.session,
+            self.screen_output_format,
+            self.errors,
+            self.archive,
+            self.symbol_table,
+        )
+        key = (
+            "zacks_screen",
+            json.dumps(config, sort_keys=True, default=str),
+            self.screen_output_format,
+        )
+        return self.flights.do(key, lambda: screener.run(config))
+
+    def export_screen_snapshot(self, fields: List[str] = None):
+        # numpy and pandas only load when a snapshot is used
+        from .screen_snapshot import ScreenSnapshot
+
+        self.login()
+
+        return ScreenSnapshot.export(self.session, fields)
 
     def scrape_earnings_release(self, timestamp: datetime):
         self.login()
 
-        earnings_release = EarningsReleaseScraper(self.session)
-        return earnings_release.scrape(timestamp)
+        earnings_release = EarningsReleaseScraper(
+            self.session,
+            self.output_format,
+            self.errors,
+            self.archive,
+            self.symbol_table,
+        )
+        key = ("zacks_release", int(timestamp.timestamp()), self.output_format)
+        return self.flights.do(key, lambda: earnings_release.scrape(timestamp))
 
     def scrape_earnings_calendar(self, tab: EarningsCalendarTab, dt: datetime):
         self.login()
 
-        earnings_calendar = EarningsCalendarScraper(self.session)
-        return earnings_calendar.scrape(tab, dt)
+        earnings_calendar = EarningsCalendarScraper(
+            self.session,
+            self.output_format,
+            self.errors,
+            self.archive,
+            self.symbol_table,
+        )
+        key = self.calendar_key(tab, dt)
+        return self.flights.do(key, lambda: earnings_calendar.scrape(tab, dt))
+
+    def calendar_key(self, tab: EarningsCalendarTab, dt: datetime):
+        return ("zacks_calendar", tab.value, int(dt.timestamp()), self.output_format)
+
+    # Backfills over a date range, one request per trading day. Weekends and
+    # market holidays only return empty tables, so they're skipped.
+    def scrape_earnings_calendar_range(
+        self, tab: EarningsCalendarTab, start: datetime, end: datetime
+    ):
+        return {
+            day: self.scrape_earnings_calendar(tab, datetime.combine(day, time()))
+            for day in trading_calendar.trading_days(start, end)
+        }
+
+    def scrape_earnings_release_range(self, start: datetime, end: datetime):
+        return {
+            day: self.scrape_earnings_release(datetime.combine(day, time()))
+            for day in trading_calendar.trading_days(start, end)
+        }
@@ -0,0 +1,157 @@
+from typing import List, Union
+import json
+import os
+
+import pandas as pd
+
+# Point-in-time history of screen results. Each run is stored as a diff
+# against the previous run of the same screen: entries (full rows), exits
+# (keys only) and changed field values, in long format as zstd Parquet. A
+# full keyframe is written every keyframe_every runs, so any date is rebuilt
+# from the nearest keyframe plus a bounded number of diffs.
+
+KEY_COLUMN = "Ticker"
+ENTER = "enter"
+EXIT = "exit"
+CHANGE = "change"
+
+diff_columns = ["key", "op", "field", "value"]
+
+
+def to_frame(result: Union[pd.DataFrame, List[List[str]]]) -> pd.DataFrame:
+    # StockScreener.run returns CSV rows unless an output format is set
+    if isinstance(result, pd.DataFrame):
+        df = result.copy()
+    else:
+        df = pd.DataFrame(result[1:], columns=result[0])
+    return df.astype(str)
+
+
+class ScreenHistory:
+    def __init__(self, root: str, keyframe_every=30, key=KEY_COLUMN):
+        self.root = root
+        self.keyframe_every = keyframe_every
+        self.key = key
+
+    def screen_dir(self, screen: str):
+        return os.path.join(self.root, screen)
+
+    def index_path(self, screen: str):
+        return os.path.join(self.screen_dir(screen), "index.json")
+
+    def load_index(self, screen: str):
+        path = self.index_path(screen)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def save_index(self, screen: str, index):
+        tmp = self.index_path(screen) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index_path(screen))
+
+    def path(self, screen: str, date: str, kind: str):
+        return os.path.join(self.screen_dir(screen), f"{date}.{kind}.parquet")
+
+    def save(self, screen: str, date: str, result):
+        # date as "%Y%m%d", runs must be saved in date order
+        df = to_frame(result).drop_duplicates(self.key).set_index(self.key)
+        index = self.load_index(screen)
+        if index and date <= index[-1]["date"]:
+            raise ValueError(f"{screen}: {date} is not after {index[-1]['date']}")
+
+        os.makedirs(self.screen_dir(screen), exist_ok=True)
+
+        since_keyframe = 0
+        for entry in reversed(index):
+            if entry["keyframe"]:
+                break
+            since_keyframe += 1
+
+        keyframe = len(index) == 0 or since_keyframe + 1 >= self.keyframe_every
+        if not keyframe:
+            previous = self.load(screen, index[-1]["date"])
+            diff = self.diff(previous, df)
+            diff.to_parquet(
+                self.path(screen, date, "diff"), index=False, compression="zstd"
+            )
+        else:
+            df.reset_index().to_parquet(
+                self.path(screen, date, "key"), index=False, compression="zstd"
+            )
+
+        index.append({"date": date, "keyframe": keyframe, "rows": len(df)})
+        self.save_index(screen, index)
+
+    def diff(self, previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+        entered = current.index.difference(previous.index)
+        exited = previous.index.difference(current.index)
+        common = current.index.intersection(previous.index)
+
+        parts = []
+        if len(entered) > 0:
+            rows = self.long_format(current.loc[entered])
+            parts.append(rows.assign(op=ENTER))
+
+        if len(exited) > 0:
+            parts.append(
+                pd.DataFrame({"key": exited, "op": EXIT, "field": None, "value": None})
+            )
+
+        columns = current.columns.union(previous.columns)
+        old = previous.reindex(index=common, columns=columns)
+        new = current.reindex(index=common, columns=columns)
+        changed = old.ne(new) & ~(old.isna() & new.isna())
+        if changed.to_numpy().any():
+            rows = self.long_format(new.where(changed))
+            parts.append(rows.dropna(subset=["value"]).assign(op=CHANGE))
+
+        if len(parts) == 0:
+            return pd.DataFrame(columns=diff_columns)
+        return pd.concat(parts, ignore_index=True)[diff_columns]
+
+    def long_format(self, df: pd.DataFrame) -> pd.DataFrame:
+        long = df.rename_axis("key").reset_index()
+        return long.melt(id_vars="key", var_name="field", value_name="value")
+
+    def apply(self, df: pd.DataFrame, diff: pd.DataFrame) -> pd.DataFrame:
+        exits = diff.loc[diff["op"] == EXIT, "key"]
+        df = df.drop(index=exits, errors="ignore")
+
+        entries = diff[diff["op"] == ENTER]
+        if len(entries) > 0:
+            rows = entries.pivot(index="key", columns="field", values="value")
+            df = pd.concat([df, rows.reindex(columns=df.columns.union(rows.columns))])
+
+        changes = diff[diff["op"] == CHANGE]
+        if len(changes) > 0:
+            updates = changes.pivot(index="key", columns="field", values="value")
+            for column in updates.columns:
+                if column not in df.columns:
+                    df[column] = None
+            df.update(updates)
+
+        return df
+
+    def load(self, screen: str, date: str) -> pd.DataFrame:
+        # Screen result as of date, the latest run on or before it
+        index = [entry for entry in self.load_index(screen) if entry["date"] <= date]
+        if len(index) == 0:
+            raise KeyError(f"{screen}: no runs on or before {date}")
+
+        start = max(i for i, entry in enumerate(index) if entry["keyframe"])
+        df = pd.read_parquet(self.path(screen, index[start]["date"], "key"))
+        df = df.set_index(self.key)
+        df.index.name = "key"
+
+        for entry in index[start + 1 :]:
+            diff = pd.read_parquet(self.path(screen, entry["date"], "diff"))
+            df = self.apply(df, diff)
+
+        df.index.name = self.key
+        return df
+
+    def membership(self, screen: str, date: str) -> List[str]:
+        return sorted(self.load(screen, date).index)
@@ -0,0 +1,135 @@
+from typing import Any, Dict, List
+import operator
+
+import numpy as np
+import pandas as pd
+
+from .stock_screener import StockScreener
+from .stock_screener_query import OperatorAQuery, OperatorBQuery, strategies
+
+# Local screen evaluation. The universe is exported once with every field in
+# stock_screener_query.strategies into a typed columnar snapshot, then screen
+# configs are evaluated as vectorized predicates with the same operators as
+# the screener (>=, <=, =, <>), no round trip per screen.
+#
+# Every condition drops stocks where its field is blank, so each field is
+# exported on its own and the exports are outer-joined on the ticker. A stock
+# with a blank dividend yield still has all its other fields.
+
+KEY_COLUMN = "Ticker"
+
+# Style scores are letters, compared by rank so "<= B" means A or B
+score_ranks = {"A": 1, "B": 2, "C": 3, "D": 4, "E": 5, "F": 6}
+
+operators = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "=": operator.eq,
+    "<>": operator.ne,
+}
+
+
+def snapshot_fields():
+    return {
+        id: strategy
+        for id, strategy in strategies.items()
+        if isinstance(strategy, (OperatorAQuery, OperatorBQuery))
+    }
+
+
+def universe_config(fields: List[str]):
+    # A condition per field that every stock with a value passes, so the
+    # export carries the columns
+    config = []
+    for id in fields:
+        strategy = strategies[id]
+        if isinstance(strategy, OperatorBQuery):
+            config.append({"id": id, "value": "Z", "operator": "<>"})
+        else:
+            config.append({"id": id, "value": "-999999999", "operator": "<>"})
+    return config
+
+
+class ScreenSnapshot:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        # Columns as NumPy arrays, evaluated without going through pandas
+        self.arrays = {
+            column: df[column].to_numpy()
+            for column in df.columns
+            if pd.api.types.is_numeric_dtype(df[column])
+        }
+
+    @classmethod
+    def export(cls, session, fields: List[str] = None):
+        fields = fields or list(snapshot_fields())
+        screener = StockScreener(session)
+
+        df = None
+        for id in fields:
+            rows = screener.run(universe_config([id]))
+            if len(rows) == 0:
+                continue
+            export = pd.DataFrame(rows[1:], columns=rows[0]).set_index(KEY_COLUMN)
+            export = export[~export.index.duplicated()]
+            df = export if df is None else df.combine_first(export)
+
+        if df is None:
+            return cls.from_frame(pd.DataFrame(columns=[KEY_COLUMN]), fields)
+        return cls.from_frame(df.reset_index(), fields)
+
+    @classmethod
+    def from_rows(cls, rows: List[List[str]], fields: List[str] = None):
+        return cls.from_frame(pd.DataFrame(rows[1:], columns=rows[0]), fields)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, fields: List[str] = None):
+        fields = fields or list(snapshot_fields())
+
+        # Export headers are the screener item names
+        for id in fields:
+            strategy = strategies[id]
+            column = strategy.p_item_name
+            if column not in df.columns:
+                continue
+
+            if isinstance(strategy, OperatorBQuery):
+                df[id] = df[column].str.strip().str.upper().map(score_ranks)
+            else:
+                df[id] = pd.to_numeric(df[column], errors="coerce")
+            df[id] = df[id].astype("float64")
+
+        return cls(df)
+
+    @classmethod
+    def load(cls, path: str):
+        return cls(pd.read_parquet(path))
+
+    def save(self, path: str):
+        self.df.to_parquet(path, index=False)
+
+    def mask(self, config: List[Dict[str, Any]]):
+        mask = np.ones(len(self.df), dtype=bool)
+        for item in config:
+            id = item.get("id")
+            if id not in self.arrays:
+                raise KeyError(f"Field not in snapshot: {id}")
+
+            strategy = strategies[id]
+            value = item.get("value")
+            if isinstance(strategy, OperatorBQuery):
+                value = score_ranks[str(value).strip().upper()]
+            else:
+                value = float(value)
+
+            values = self.arrays[id]
+            # Missing values never match, like the screener
+            mask &= ~np.isnan(values) & operators[item.get("operator")](values, value)
+
+        return mask
+
+    def run(self, config: List[Dict[str, Any]]) -> pd.DataFrame:
+        return self.df[self.mask(config)]
+
+    def run_many(self, configs: List[List[Dict[str, Any]]]) -> List[pd.DataFrame]:
+        return [self.run(config) for config in configs]
@@ -1,15 +1,53 @@
 import requests
 from typing import Any, Dict, List
-from bs4 import BeautifulSoup
 import urllib
 import csv
 from .stock_screener_query import write_query
 from .util import create_multipart_formdata
+from ..errors import ErrorCollector
+from ..output import build_frame, check_format
+
+
+def parse_export(text: str) -> List[List[str]]:
+    return list(csv.reader(text.splitlines()))
+
+
+def format_rows(data: List[List[str]], output_format=None, symbol_table=None):
+    # Raw CSV rows for output_format=None, else a frame with the header row
+    # as columns, plus symbol_id from the Ticker column with a symbol_table
+    if output_format is None or len(data) == 0:
+        return data
+
+    columns = data[0]
+    rows = [dict(zip(columns, row)) for row in data[1:]]
+    df = build_frame(rows, columns, output_format)
+    if symbol_table is not None and "Ticker" in columns:
+        from ..symbols import add_symbol_ids
+
+        df = add_symbol_ids(df, "Ticker", symbol_table)
+    return df
 
 
 class StockScreener:
-    def __init__(self, session: requests.Session):
+    # output_format=None keeps the raw CSV rows, otherwise the export is built
+    # into a frame with the header row as columns
+    def __init__(
+        self,
+        session: requests.Session,
+        output_format=None,
+        errors: ErrorCollector = None,
+        archive=None,
+        symbol_table=None,
+    ):
         self.session = session
+        self.archive = archive
+        # Optional SymbolTable, adds a symbol_id column to frame output
+        self.symbol_table = symbol_table
+        self.parameters = None
+        self.output_format = output_format
+        self.errors = errors if errors is not None else ErrorCollector()
+        if output_format is not None:
+            check_format(output_format)
         self.session.headers.update(
             {
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9"
@@ -21,6 +59,8 @@ class StockScreener:
         response = self.session.get(url)
         response.raise_for_status()
 
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(response.text, "html.parser")
         iframe = soup.find("iframe")
 
@@ -59,7 +99,7 @@ class StockScreener:
     def send_query(self, parameters: List[Dict[str, Any]]) -> None:
         url = "https://screener-api.zacks.com/getrunscreendata.php"
 
-        form_data = write_query(parameters)
+        form_data = write_query(parameters, self.errors)
         content_type, body = create_multipart_formdata(form_data)
 
         headers = {
@@ -74,13 +114,18 @@ class StockScreener:
         response = self.session.get(url)
         response.raise_for_status()
 
-        reader = csv.reader(response.text.splitlines())
-        return list(reader)
+        if self.archive is not None:
+            self.archive.put(
+                "zacks_screen", response.text, {"url": url, "config": self.parameters}
+            )
+
+        return parse_export(response.text)
 
     def run(self, parameters: List[Dict[str, Any]]):
         parsed = self.fetch_stock_screener_page()
         self.fetch_screener_api(parsed)
         self.reset_query_params()
+        self.parameters = parameters
         self.send_query(parameters)
         data = self.download_data(parsed)
-        return data
+        return format_rows(data, self.output_format, self.symbol_table)
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, OrderedDict
+import warnings
 
 
 class QueryStrategy(ABC):
@@ -87,7 +88,7 @@ strategies = {
 }
 
 
-def write_query(config: List[Dict[str, Any]]):
+def write_query(config: List[Dict[str, Any]], errors=None):
     # Common form data for all requests
     form_data = [
         ("is_only_matches", "1"),
@@ -111,7 +112,9 @@ def write_query(config: List[Dict[str, Any]]):
             parameters = strategy.write_query(value, operator)
             for key in parameters:
                 form_data.append((key, parameters[key]))
+        elif errors is not None:
+            errors.record("screen_query", item, KeyError(f"Unknown id: {id}"))
         else:
-            print(f"Unknown id: {id}")
+            warnings.warn(f"Unknown screen id: {id}")
 
     return form_data
@@ -6,9 +6,9 @@ import datetime
 from dotenv import load_dotenv
 import os
 
-load_dotenv()
-
 def setup_test():
+    load_dotenv()
+
     # Suprress warning from insecure request due to proxy use
     warnings.simplefilter("ignore", InsecureRequestWarning)
 
@@ -1,3 +1,46 @@
-from . import AlphaVantage
-from . import WSH
-from . import Zacks
+import importlib
+
+# Subpackages and their dependencies (pandas, duckdb, bs4) are imported on
+# first attribute access, so "import StockClients" stays cheap for short-lived
+# workers.
+lazy_modules = {
+    "AlphaVantage",
+    "WSH",
+    "Zacks",
+    "parse_pool",
+    "reconcile",
+    "singleflight",
+    "orchestrator",
+    "archive",
+    "symbols",
+    "trading_calendar",
+    "prefetch",
+    "surprise",
+    "corporate_actions",
+}
+lazy_attributes = {
+    "ParsePool": ".parse_pool",
+    "SingleFlight": ".singleflight",
+    "Orchestrator": ".orchestrator",
+    "ResponseArchive": ".archive",
+    "SymbolTable": ".symbols",
+    "Prefetcher": ".prefetch",
+    "CorporateActionsIndex": ".corporate_actions",
+}
+
+
+def __getattr__(name):
+    if name in lazy_modules:
+        return importlib.import_module(f".{name}", __name__)
+
+    if name in lazy_attributes:
+        module = importlib.import_module(lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | lazy_modules | set(lazy_attributes))
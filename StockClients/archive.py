@@ -0,0 +1,208 @@
+from datetime import datetime
+from typing import Dict, Iterator
+import gzip
+import hashlib
+import json
+import os
+import threading
+import urllib.parse
+
+from .errors import ErrorCollector
+
+# Opt-in archive of raw response bodies. Bodies are gzip-compressed blobs
+# addressed by their sha256, so repeated identical responses are stored once,
+# with one JSON line of request metadata per fetch. reparse() replays archived
+# bodies through the current parsers, so parser fixes or layout changes don't
+# need a re-scrape.
+
+# Credentials never go into the metadata
+secret_params = {"c", "p", "apikey", "password", "username"}
+
+
+def strip_secrets(url: str):
+    parsed = urllib.parse.urlparse(url)
+    query = [
+        (key, value)
+        for key, value in urllib.parse.parse_qsl(parsed.query)
+        if key not in secret_params
+    ]
+    return parsed._replace(query=urllib.parse.urlencode(query)).geturl()
+
+
+class ResponseArchive:
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def blob_path(self, digest: str):
+        return os.path.join(self.root, "blobs", digest[:2], digest + ".gz")
+
+    def index_path(self, source: str):
+        return os.path.join(self.root, "index", f"{source}.jsonl")
+
+    def put(self, source: str, body, metadata: Dict = None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+        entry = {
+            "source": source,
+            "digest": digest,
+            "fetched_at": datetime.now().isoformat(),
+            **(metadata or {}),
+        }
+        if "url" in entry:
+            entry["url"] = strip_secrets(entry["url"])
+
+        with self.lock:
+            os.makedirs(os.path.dirname(self.index_path(source)), exist_ok=True)
+            with open(self.index_path(source), "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+        return digest
+
+    def get(self, digest: str) -> str:
+        with gzip.open(self.blob_path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def entries(self, source: str) -> Iterator[Dict]:
+        path = self.index_path(source)
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def sources(self):
+        index_dir = os.path.join(self.root, "index")
+        if not os.path.exists(index_dir):
+            return []
+        return sorted(
+            name[: -len(".jsonl")]
+            for name in os.listdir(index_dir)
+            if name.endswith(".jsonl")
+        )
+
+
+def query_param(entry: Dict, name: str):
+    query = urllib.parse.urlparse(entry["url"]).query
+    return urllib.parse.parse_qs(query)[name][0]
+
+
+def reparse_jobs(source: str, entry: Dict):
+    # Parser kind and arguments for an archived body, None if it's parsed
+    # in the main process
+    if source == "wsh":
+        return "wsh", {}
+    if source == "zacks_calendar":
+        from .Zacks.earnings_calendar import EarningsCalendarTab
+
+        return "earnings_calendar", {"tab": EarningsCalendarTab[entry["tab"]]}
+    return None
+
+
+def parse_inline(source: str, entry: Dict, body: str):
+    # Screener exports and AlphaVantage bodies, through the same code the
+    # clients parse them with
+    if source == "zacks_screen":
+        from .output import PANDAS
+        from .Zacks.stock_screener import format_rows, parse_export
+
+        df = format_rows(parse_export(body), PANDAS)
+        return df if len(df) > 0 else None
+    if source == "alphavantage_csv":
+        from .AlphaVantage.av_client import parse_csv_body
+
+        return parse_csv_body(body.encode("utf-8"), query_param(entry, "function"))
+    if source == "alphavantage_eps":
+        from .AlphaVantage.av_client import eps_history_frame
+
+        ticker = query_param(entry, "symbol")
+        return eps_history_frame(ticker, json.loads(body))
+    raise ValueError(f"No parser for archived source: {source}")
+
+
+def release_days(entries):
+    # Release tabs grouped by the day they were scraped for, like scrape()
+    # assembles them. A tab archived more than once keeps its latest fetch.
+    days = {}
+    for entry in entries:
+        days.setdefault(entry["timestamp"], {})[entry["tab"]] = entry
+    return days
+
+
+def reparse(
+    archive: ResponseArchive,
+    out_dir: str,
+    sources=None,
+    max_workers=None,
+    errors: ErrorCollector = None,
+):
+    # Replay archived bodies through the current parsers in parallel and write
+    # one Parquet dataset per source (per class for WSH). Parse failures are
+    # recorded in errors, and its failure threshold applies to every body.
+    import pandas as pd
+    from .parse_pool import ParsePool
+
+    sources = sources or archive.sources()
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+
+    with ParsePool(max_workers=max_workers) as pool:
+        for source in sources:
+            entries = list(archive.entries(source))
+            futures = []
+            frames = {}
+
+            if source == "zacks_release":
+                for timestamp, tabs in release_days(entries).items():
+                    bodies = {
+                        tab: archive.get(entry["digest"]) for tab, entry in tabs.items()
+                    }
+                    future = pool.submit(
+                        "earnings_release_day", bodies, errors, timestamp=timestamp
+                    )
+                    # Rows are tagged with the ALL tab, the one most rows come from
+                    entry = tabs.get("ALL", next(iter(tabs.values())))
+                    futures.append((entry, future))
+                entries = []
+
+            for entry in entries:
+                body = archive.get(entry["digest"])
+                job = reparse_jobs(source, entry)
+                if job is not None:
+                    futures.append((entry, pool.submit(job[0], body, errors, **job[1])))
+                    continue
+
+                df = parse_inline(source, entry, body)
+                if df is None:
+                    continue
+                df = df.assign(archive_digest=entry["digest"])
+                frames.setdefault(source, []).append(df)
+
+            for entry, future in futures:
+                result = future.result()
+                if not isinstance(result, dict):
+                    result = {source: result}
+                for name, df in result.items():
+                    if df is None:
+                        continue
+                    df = df.assign(archive_digest=entry["digest"])
+                    frames.setdefault(name, []).append(df)
+
+            for name, dfs in frames.items():
+                key = name if name == source else f"{source}_{name}"
+                path = os.path.join(out_dir, f"{key}.parquet")
+                pd.concat(dfs, ignore_index=True).to_parquet(path, index=False)
+                written[key] = path
+
+    return written
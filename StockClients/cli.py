@@ -0,0 +1,274 @@
+from datetime import datetime
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from . import trading_calendar
+from .orchestrator import Job, Orchestrator, ProviderBudget, client_handlers
+from .singleflight import SingleFlight
+
+# Manifest-driven batch runner, installed as the stockclients-run console
+# script. The manifest is JSON:
+#
+#   {
+#     "output_dir": "out",
+#     "workers": 8,
+#     "cache_ttl": 3600,
+#     "budgets": {"zacks": {"concurrency": 2, "requests_per_minute": 30}},
+#     "jobs": {
+#       "zacks_calendar": {
+#         "tabs": ["earnings", "guidance"], "from": "2024-01-02", "to": "2024-01-31"
+#       },
+#       "zacks_release": {"from": "2024-01-02", "to": "2024-01-31"},
+#       "zacks_screen": [{"name": "value", "config": [...]}],
+#       "wsh": {"classes": ["ed"], "from": "2024-01-02", "to": "2024-03-31"},
+#       "av_eps": {"tickers": ["AAPL"], "tickers_file": "tickers.txt"}
+#     }
+#   }
+#
+# Dates are "%Y-%m-%d", calendar and release jobs run once per trading day.
+# Providers without a budget run one job at a time, like the Orchestrator.
+# Jobs share one client per provider (one session, one SingleFlight), run on
+# the Orchestrator and every result is written as Parquet under
+# output_dir/<job kind>/. Credentials come from the environment or a .env.
+
+ZACKS = "zacks"
+WSH = "wsh"
+ALPHAVANTAGE = "alphavantage"
+
+providers = {
+    "zacks_calendar": ZACKS,
+    "zacks_release": ZACKS,
+    "zacks_screen": ZACKS,
+    "wsh_window": WSH,
+    "av_eps": ALPHAVANTAGE,
+}
+
+
+def parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def expand_jobs(manifest: Dict[str, Any], clients: Dict[str, Any]) -> List[Job]:
+    specs = manifest.get("jobs", {})
+    priority = manifest.get("priority", 10)
+    jobs = []
+
+    def add(kind: str, params: Dict[str, Any]):
+        jobs.append(Job(providers[kind], kind, params, priority))
+
+    if "zacks_calendar" in specs:
+        spec = specs["zacks_calendar"]
+        days = trading_calendar.trading_days(
+            parse_date(spec["from"]), parse_date(spec["to"])
+        )
+        for day in days:
+            for tab in spec.get("tabs", ["earnings"]):
+                add("zacks_calendar", {"tab": tab, "date": day.isoformat()})
+
+    if "zacks_release" in specs:
+        spec = specs["zacks_release"]
+        days = trading_calendar.trading_days(
+            parse_date(spec["from"]), parse_date(spec["to"])
+        )
+        for day in days:
+            add("zacks_release", {"date": day.isoformat()})
+
+    for screen in specs.get("zacks_screen", []):
+        add("zacks_screen", {"name": screen["name"], "config": screen["config"]})
+
+    if "wsh" in specs:
+        spec = specs["wsh"]
+        # Windows are split here, one job per window and class (each job
+        # fetches exactly its window) since WSH takes one class per request
+        # for all symbols
+        windows = clients["wsh"].split_date_range(
+            parse_date(spec["from"]).strftime("%m/%d/%Y"),
+            parse_date(spec["to"]).strftime("%m/%d/%Y"),
+            spec.get("window_days", 7),
+            spec.get("trading_days", False),
+        )
+        for start, end in windows:
+            for cls in spec["classes"]:
+                add("wsh_window", {"classes": [cls], "from": start, "to": end})
+
+    if "av_eps" in specs:
+        spec = specs["av_eps"]
+        tickers = list(spec.get("tickers", []))
+        if "tickers_file" in spec:
+            with open(spec["tickers_file"], "r") as f:
+                tickers += [line.strip() for line in f if line.strip()]
+        for ticker in dict.fromkeys(t.upper() for t in tickers):
+            add("av_eps", {"ticker": ticker})
+
+    return jobs
+
+
+def build_clients(manifest: Dict[str, Any]):
+    from .output import PANDAS
+
+    specs = manifest.get("jobs", {})
+    flights = SingleFlight(ttl=manifest.get("cache_ttl", 0))
+    clients = {}
+
+    if specs.keys() & {"zacks_calendar", "zacks_release", "zacks_screen"}:
+        from .Zacks.scraper import ZacksScraper
+
+        clients["zacks"] = ZacksScraper(
+            os.getenv("ZACKS_USER"),
+            os.getenv("ZACKS_PASSWORD"),
+            screen_output_format=PANDAS,
+            flights=flights,
+        )
+    if "wsh" in specs:
+        from .WSH.wsh_client import WSHClient
+
+        clients["wsh"] = WSHClient(
+            os.getenv("WSH_CUSTOMER_ID"), os.getenv("WSH_PASSWORD"), flights=flights
+        )
+    if "av_eps" in specs:
+        from .AlphaVantage.av_client import AlphaVantageClient
+
+        clients["av"] = AlphaVantageClient(
+            os.getenv("ALPHAVANTAGE_API_KEY"), flights=flights
+        )
+
+    return clients
+
+
+def write_result(result, path: str):
+    # DataFrames, or WSH's dict of frames per class
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        base, ext = os.path.splitext(path)
+        return sum(
+            write_result(df, f"{base}.{cls}{ext}") for cls, df in result.items()
+        )
+    result.to_parquet(path, index=False)
+    return len(result)
+
+
+class JobStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.rows = {}
+        self.failures = {}
+        self.first = {}
+        self.last = {}
+
+    def timed(self, kind: str, handler, output_dir: str):
+        # Runs the job and writes its output, a failed write fails the job so
+        # it's counted, retried or recorded like any other error
+        job_dir = os.path.join(output_dir, kind)
+
+        def run(params):
+            start = time.monotonic()
+            try:
+                result = handler(params)
+                job_id = Job(providers[kind], kind, params).id
+                os.makedirs(job_dir, exist_ok=True)
+                rows = write_result(result, os.path.join(job_dir, f"{job_id}.parquet"))
+            except Exception:
+                with self.lock:
+                    self.failures[kind] = self.failures.get(kind, 0) + 1
+                raise
+            end = time.monotonic()
+
+            with self.lock:
+                self.latencies.setdefault(kind, []).append(end - start)
+                self.first[kind] = min(self.first.get(kind, start), start)
+                self.last[kind] = max(self.last.get(kind, end), end)
+                self.rows[kind] = self.rows.get(kind, 0) + rows
+            # Only the row count is kept in the Orchestrator's results, the
+            # frames are on disk
+            return rows
+
+        return run
+
+    def summary(self):
+        lines = [
+            f"{'job':<16}{'ok':>7}{'errors':>8}{'rows':>10}"
+            f"{'jobs/s':>9}{'p50 s':>9}{'p95 s':>9}{'max s':>9}"
+        ]
+        for kind in sorted(set(self.latencies) | set(self.failures)):
+            latencies = sorted(self.latencies.get(kind, []))
+            n = len(latencies)
+            elapsed = self.last.get(kind, 0) - self.first.get(kind, 0)
+            rate = n / elapsed if elapsed > 0 else float(n)
+            p50 = latencies[n // 2] if n else 0.0
+            p95 = latencies[min(n - 1, int(n * 0.95))] if n else 0.0
+            top = latencies[-1] if n else 0.0
+            lines.append(
+                f"{kind:<16}{n:>7}{self.failures.get(kind, 0):>8}"
+                f"{self.rows.get(kind, 0):>10}{rate:>9.2f}"
+                f"{p50:>9.2f}{p95:>9.2f}{top:>9.2f}"
+            )
+        return "\n".join(lines)
+
+
+def run(manifest: Dict[str, Any], workers=None, output_dir=None):
+    output_dir = output_dir or manifest.get("output_dir", "out")
+    os.makedirs(output_dir, exist_ok=True)
+
+    clients = build_clients(manifest)
+    jobs = expand_jobs(manifest, clients)
+    stats = JobStats()
+
+    handlers = client_handlers(
+        clients.get("zacks"), clients.get("wsh"), clients.get("av")
+    )
+    handlers = {
+        kind: stats.timed(kind, handler, output_dir)
+        for kind, handler in handlers.items()
+    }
+
+    budgets = {
+        provider: ProviderBudget(**budget)
+        for provider, budget in manifest.get("budgets", {}).items()
+    }
+
+    orchestrator = Orchestrator(
+        handlers,
+        budgets,
+        max_workers=workers or manifest.get("workers", 8),
+        state_file=os.path.join(output_dir, "orchestrator_state.json"),
+    )
+    for job in jobs:
+        orchestrator.submit(job)
+
+    start = time.monotonic()
+    orchestrator.run()
+    elapsed = time.monotonic() - start
+
+    print(stats.summary())
+    print(f"{len(jobs)} jobs in {elapsed:.1f}s, {len(orchestrator.failed)} failed")
+    return orchestrator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="stockclients-run", description="Run a job manifest"
+    )
+    parser.add_argument("manifest", help="JSON job manifest")
+    parser.add_argument("--workers", type=int, help="overrides the manifest")
+    parser.add_argument("--output-dir", help="overrides the manifest")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+
+    with open(args.manifest, "r") as f:
+        manifest = json.load(f)
+
+    orchestrator = run(manifest, args.workers, args.output_dir)
+    return 1 if orchestrator.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+from datetime import datetime
+from typing import Iterable, List
+import numpy as np
+import pandas as pd
+
+from .surprise import to_numbers
+from .symbols import normalize_ticker
+
+# Cumulative price and per-share adjustment factors from the Zacks DIVIDENDS
+# and SPLITS calendar tabs. Events are kept in one array sorted by
+# (symbol, date) with running sums of log factors, so the factor between two
+# dates is two binary searches and a subtraction, and a batch of queries for
+# the whole universe is two np.searchsorted calls.
+#
+# factor(symbol, start, end) multiplies a value observed at start into the
+# basis of end: events with start < ex date <= end are applied, and going
+# backwards in time gives the inverse. "price" applies splits and dividends,
+# "split" only splits (EPS and other per-share values).
+
+SPLIT = "split"
+DIVIDEND = "dividend"
+PRICE = "price"
+
+event_columns = ["symbol", "date", "kind", "factor"]
+
+# Keys are symbol code * KEY_SPAN + days since the epoch + DAY_OFFSET
+DAY_OFFSET = 1 << 20
+KEY_SPAN = 1 << 21
+
+
+def parse_split_factors(factors: pd.Series) -> pd.Series:
+    # "3:2" -> 1.5 new shares per old share, "1:10" for reverse splits
+    parts = factors.astype(str).str.extract(
+        r"^\s*(\d+(?:\.\d+)?)\s*[:/\-]\s*(\d+(?:\.\d+)?)\s*$"
+    )
+    ratio = parts[0].astype("float64") / parts[1].astype("float64")
+    return ratio.where(ratio > 0)
+
+
+def to_days(dates) -> np.ndarray:
+    days = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy()
+    return days.astype("datetime64[D]").astype("int64") + DAY_OFFSET
+
+
+class CorporateActionsIndex:
+    def __init__(self):
+        self.pending = []
+        self.events = pd.DataFrame(columns=event_columns)
+        self.symbols = pd.Index([], dtype=object)
+        self.codes = {}
+        self.keys = np.array([], dtype="int64")
+        self.cumulative = {
+            PRICE: np.zeros(1),
+            SPLIT: np.zeros(1),
+        }
+        self.dirty = False
+
+    def add_events(self, events: pd.DataFrame):
+        events = events[event_columns].dropna()
+        events = events[events["factor"] > 0]
+        self.pending.append(events)
+        self.dirty = True
+
+    def add_dividends(self, df: pd.DataFrame):
+        # EarningsCalendarTab.DIVIDENDS rows. The factor is 1 - amount / price
+        # with the price shown on the tab as the close before the ex date.
+        amount = to_numbers(df["amount"])
+        price = to_numbers(df["current_price"])
+        factor = (1 - amount / price).where((amount > 0) & (price > amount))
+        self.add_events(
+            pd.DataFrame(
+                {
+                    "symbol": normalize_ticker(df["symbol"]),
+                    "date": pd.to_datetime(df["ex_div_date"], errors="coerce"),
+                    "kind": DIVIDEND,
+                    "factor": factor,
+                }
+            )
+        )
+
+    def add_splits(self, df: pd.DataFrame, dt: datetime):
+        # EarningsCalendarTab.SPLITS rows for the day they were scraped, the
+        # tab has no date column. Prices scale by old / new shares.
+        self.add_events(
+            pd.DataFrame(
+                {
+                    "symbol": normalize_ticker(df["symbol"]),
+                    "date": pd.Timestamp(dt).normalize(),
+                    "kind": SPLIT,
+                    "factor": 1 / parse_split_factors(df["split_factor"]),
+                }
+            )
+        )
+
+    def build(self):
+        if not self.dirty:
+            return
+
+        events = pd.concat([self.events] + self.pending, ignore_index=True)
+        events["date"] = pd.to_datetime(events["date"]).dt.normalize()
+        # Tabs are pulled daily, the same event can show up more than once
+        events = events.drop_duplicates(["symbol", "date", "kind"], keep="last")
+        events = events.sort_values(["symbol", "date"], ignore_index=True)
+
+        codes, symbols = pd.factorize(events["symbol"], sort=True)
+        logs = np.log(events["factor"].to_numpy(dtype="float64"))
+        splits = np.where(events["kind"].to_numpy() == SPLIT, logs, 0.0)
+
+        self.events = events
+        self.symbols = pd.Index(symbols, dtype=object)
+        self.codes = {symbol: code for code, symbol in enumerate(symbols)}
+        self.keys = codes.astype("int64") * KEY_SPAN + to_days(events["date"])
+        self.cumulative = {
+            PRICE: np.concatenate([[0.0], np.cumsum(logs)]),
+            SPLIT: np.concatenate([[0.0], np.cumsum(splits)]),
+        }
+        self.pending = []
+        self.dirty = False
+
+    def factor(self, symbol: str, start, end, kind=PRICE) -> float:
+        self.build()
+        code = self.codes.get(normalize_ticker(pd.Series([symbol]))[0])
+        if code is None:
+            return 1.0
+
+        start, end = to_days([start, end])
+        lo = np.searchsorted(self.keys, code * KEY_SPAN + start, side="right")
+        hi = np.searchsorted(self.keys, code * KEY_SPAN + end, side="right")
+        cumulative = self.cumulative[kind]
+        return float(np.exp(cumulative[hi] - cumulative[lo]))
+
+    def factors(
+        self, symbols: Iterable[str], starts, ends, kind=PRICE
+    ) -> np.ndarray:
+        # Vectorized factor() for aligned arrays of symbols and dates
+        self.build()
+        symbols = normalize_ticker(pd.Series(np.asarray(symbols, dtype=object)))
+        codes = self.symbols.get_indexer(symbols)
+        known = codes >= 0
+        base = np.where(known, codes, 0).astype("int64") * KEY_SPAN
+
+        starts = pd.to_datetime(pd.Series(np.asarray(starts)), errors="coerce")
+        ends = pd.to_datetime(pd.Series(np.asarray(ends)), errors="coerce")
+        lo = np.searchsorted(self.keys, base + to_days(starts), side="right")
+        hi = np.searchsorted(self.keys, base + to_days(ends), side="right")
+        cumulative = self.cumulative[kind]
+        factors = np.where(known, np.exp(cumulative[hi] - cumulative[lo]), 1.0)
+        # Missing dates have no factor
+        dated = (starts.notna() & ends.notna()).to_numpy()
+        return np.where(dated, factors, np.nan)
+
+    def adjust(
+        self,
+        df: pd.DataFrame,
+        columns: List[str],
+        as_of,
+        symbol_column="symbol",
+        date_column="date",
+        kind=PRICE,
+    ) -> pd.DataFrame:
+        # Restate per-share columns of a long frame in the basis of as_of
+        ends = pd.Series(pd.Timestamp(as_of), index=df.index)
+        factors = self.factors(df[symbol_column], df[date_column], ends, kind)
+        df = df.copy()
+        for column in columns:
+            df[column] = df[column] * factors
+        return df
+
+    def save(self, path: str):
+        self.build()
+        self.events.to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path: str):
+        index = cls()
+        index.add_events(pd.read_parquet(path))
+        return index
@@ -0,0 +1,114 @@
+from collections import Counter, defaultdict
+import threading
+
+# Structured error channel for the row parsers. Instead of printing each bad
+# row, parsers record it here: counts per context and error type, a few sample
+# rows, and the number of rows seen for reporting. Each parse call passes its
+# own row and error counts to check(), which raises when that call's failure
+# rate crosses failure_threshold, which is how a Zacks layout change shows up.
+
+
+class ParseFailureError(Exception):
+    def __init__(self, context, summary):
+        self.context = context
+        self.summary = summary
+        super().__init__(
+            f"{context}: {summary['errors']} of {summary['rows']} rows failed to parse"
+        )
+
+
+class ErrorCollector:
+    def __init__(self, max_samples=5, failure_threshold=None, min_rows=20):
+        self.max_samples = max_samples
+        # Fraction of failed rows per context, None never raises
+        self.failure_threshold = failure_threshold
+        # Don't judge the failure rate on a handful of rows
+        self.min_rows = min_rows
+
+        self.lock = threading.Lock()
+        self.rows = Counter()
+        self.counts = Counter()
+        self.samples = defaultdict(list)
+
+    def seen(self, context: str, n=1):
+        with self.lock:
+            self.rows[context] += n
+
+    def record(self, context: str, row, error: Exception):
+        key = (context, type(error).__name__)
+        with self.lock:
+            self.counts[key] += 1
+            if len(self.samples[key]) < self.max_samples:
+                self.samples[key].append({"row": row, "error": str(error)})
+
+    def errors(self, context: str = None):
+        with self.lock:
+            return sum(
+                n for (ctx, _), n in self.counts.items() if context in (None, ctx)
+            )
+
+    def failure_rate(self, context: str):
+        # Lifetime rate, for reporting
+        rows = self.rows[context]
+        if rows == 0:
+            return 0.0
+        return self.errors(context) / rows
+
+    def check(self, context: str, rows: int, errors: int):
+        # Judged on one parse call (a tab or page), so earlier failures or a
+        # long clean history don't mask or trigger it
+        if self.failure_threshold is None or rows < self.min_rows:
+            return
+
+        if errors / rows > self.failure_threshold:
+            summary = {**self.summary(context), "rows": rows, "errors": errors}
+            raise ParseFailureError(context, summary)
+
+    def summary(self, context: str = None):
+        with self.lock:
+            by_type = {
+                f"{ctx}:{name}": n
+                for (ctx, name), n in self.counts.items()
+                if context in (None, ctx)
+            }
+            samples = {
+                f"{ctx}:{name}": list(rows)
+                for (ctx, name), rows in self.samples.items()
+                if context in (None, ctx)
+            }
+            rows = (
+                sum(self.rows.values()) if context is None else self.rows[context]
+            )
+
+        return {
+            "rows": rows,
+            "errors": sum(by_type.values()),
+            "by_type": by_type,
+            "samples": samples,
+        }
+
+    def export(self):
+        # Picklable copy of the records, for merge() in another process
+        with self.lock:
+            return {
+                "rows": dict(self.rows),
+                "counts": dict(self.counts),
+                "samples": {key: list(rows) for key, rows in self.samples.items()},
+            }
+
+    def merge(self, exported):
+        with self.lock:
+            self.rows.update(exported["rows"])
+            self.counts.update(exported["counts"])
+            for key, rows in exported["samples"].items():
+                samples = self.samples[key]
+                samples.extend(rows[: self.max_samples - len(samples)])
+
+    def has_errors(self):
+        return self.errors() > 0
+
+    def clear(self):
+        with self.lock:
+            self.rows.clear()
+            self.counts.clear()
+            self.samples.clear()
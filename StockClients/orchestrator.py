@@ -0,0 +1,311 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict
+import hashlib
+import heapq
+import json
+import os
+import threading
+import time
+
+import requests
+
+# In-process scheduler for scrape jobs. Jobs wait in a priority queue and run
+# on a shared worker pool, limited per provider by a concurrency cap and a
+# requests-per-minute budget, charged with the number of HTTP requests each
+# job makes. Transient failures are retried with backoff and
+# the queue is persisted, so a restart only runs what hasn't completed.
+
+STATE_FILENAME = "orchestrator_state.json"
+
+
+def request_cost(kind: str, params: Dict[str, Any]):
+    # HTTP requests made by a built-in job kind, other kinds count as one
+    if kind == "zacks_release":
+        from .Zacks.earnings_releases import release_tabs
+
+        return len(release_tabs)
+    if kind == "zacks_screen":
+        # Screener page, screener-api, reset, query and export
+        return 5
+    if kind == "wsh_window":
+        return max(1, len(params.get("classes", [])))
+    return 1
+
+
+class Job:
+    def __init__(
+        self,
+        provider: str,
+        kind: str,
+        params: Dict[str, Any],
+        priority=10,
+        cost=None,
+    ):
+        self.provider = provider
+        self.kind = kind
+        self.params = params
+        # Lower runs first
+        self.priority = priority
+        # Requests charged against the provider's requests_per_minute
+        self.cost = cost if cost is not None else request_cost(kind, params)
+        self.attempts = 0
+        self.not_before = 0.0
+
+    @property
+    def id(self):
+        key = json.dumps([self.provider, self.kind, self.params], sort_keys=True)
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def to_dict(self):
+        return {
+            "provider": self.provider,
+            "kind": self.kind,
+            "params": self.params,
+            "priority": self.priority,
+            "cost": self.cost,
+            "attempts": self.attempts,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(
+            data["provider"],
+            data["kind"],
+            data["params"],
+            data["priority"],
+            data.get("cost"),
+        )
+        job.attempts = data.get("attempts", 0)
+        return job
+
+
+class ProviderBudget:
+    def __init__(self, concurrency=1, requests_per_minute=None):
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.running = 0
+        # (start time, request cost) of jobs started in the last minute, only
+        # kept when there's a rate budget
+        self.started = []
+
+    def available(self, now: float, cost=1):
+        if self.running >= self.concurrency:
+            return False
+
+        if self.requests_per_minute is not None:
+            self.started = [(t, n) for t, n in self.started if now - t < 60]
+            used = sum(n for _, n in self.started)
+            # A job costing more than the whole budget runs once it's unused
+            if used > 0 and used + cost > self.requests_per_minute:
+                return False
+
+        return True
+
+    def next_slot(self, now: float):
+        # Seconds until the rate budget frees up
+        if self.requests_per_minute is None or len(self.started) == 0:
+            return 0.0
+        return max(0.0, 60 - (now - min(t for t, _ in self.started)))
+
+    def acquire(self, now: float, cost=1):
+        self.running += 1
+        if self.requests_per_minute is not None:
+            self.started.append((now, cost))
+
+    def release(self):
+        self.running -= 1
+
+
+def is_transient(e: Exception):
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+
+def client_handlers(zacks=None, wsh=None, av=None) -> Dict[str, Callable]:
+    # Handlers for the built-in job kinds, dates in params are "%Y-%m-%d"
+    from .Zacks.earnings_calendar import EarningsCalendarTab
+
+    handlers = {}
+    if zacks is not None:
+        handlers["zacks_calendar"] = lambda p: zacks.scrape_earnings_calendar(
+            EarningsCalendarTab[p["tab"].upper()],
+            datetime.strptime(p["date"], "%Y-%m-%d"),
+        )
+        handlers["zacks_release"] = lambda p: zacks.scrape_earnings_release(
+            datetime.strptime(p["date"], "%Y-%m-%d")
+        )
+        handlers["zacks_screen"] = lambda p: zacks.run_stock_screen(p["config"])
+    if wsh is not None:
+        # Windows are planned when the jobs are created, each job is fetched
+        # as exactly that window
+        handlers["wsh_window"] = lambda p: wsh.query_window(
+            p["classes"], (p["from"], p["to"]), p.get("stock_symbols", "*")
+        )
+    if av is not None:
+        handlers["av_eps"] = lambda p: av.get_eps_history(p["ticker"])
+
+    return handlers
+
+
+class Orchestrator:
+    def __init__(
+        self,
+        handlers: Dict[str, Callable],
+        budgets: Dict[str, ProviderBudget] = None,
+        max_workers=8,
+        max_retries=3,
+        backoff=5.0,
+        state_file=STATE_FILENAME,
+        on_result: Callable = None,
+    ):
+        self.handlers = handlers
+        self.budgets = budgets or {}
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.state_file = state_file
+        self.on_result = on_result
+
+        self.lock = threading.Condition()
+        self.queue = []
+        self.seq = 0
+        self.queued = {}
+        self.running = {}
+        self.completed = set()
+        self.failed = {}
+        self.results = {}
+
+        self.load_state()
+
+    def budget(self, provider: str):
+        if provider not in self.budgets:
+            self.budgets[provider] = ProviderBudget()
+        return self.budgets[provider]
+
+    def submit(self, job: Job):
+        with self.lock:
+            job_id = job.id
+            if (
+                job_id in self.completed
+                or job_id in self.queued
+                or job_id in self.running
+            ):
+                return False
+
+            self.push(job)
+            self.save_state()
+            self.lock.notify_all()
+            return True
+
+    def push(self, job: Job):
+        self.seq += 1
+        self.queued[job.id] = job
+        heapq.heappush(self.queue, (job.priority, self.seq, job))
+
+    def next_job(self, now: float):
+        # Highest priority job whose provider has budget left
+        skipped = []
+        job = None
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            candidate = entry[2]
+            budget = self.budget(candidate.provider)
+            if candidate.not_before <= now and budget.available(now, candidate.cost):
+                job = candidate
+                break
+            skipped.append(entry)
+
+        for entry in skipped:
+            heapq.heappush(self.queue, entry)
+
+        return job
+
+    def wait_time(self, now: float):
+        waits = []
+        for _, _, job in self.queue:
+            budget = self.budget(job.provider)
+            waits.append(max(job.not_before - now, budget.next_slot(now)))
+        return max(0.1, min(waits, default=1.0))
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            with self.lock:
+                while self.queue or self.running:
+                    now = time.monotonic()
+                    job = None
+                    if len(self.running) < self.max_workers:
+                        job = self.next_job(now)
+
+                    if job is None:
+                        self.lock.wait(timeout=self.wait_time(now))
+                        continue
+
+                    del self.queued[job.id]
+                    self.running[job.id] = job
+                    self.budget(job.provider).acquire(now, job.cost)
+                    executor.submit(self.execute, job)
+
+        return self.results
+
+    def execute(self, job: Job):
+        error = None
+        result = None
+        try:
+            result = self.handlers[job.kind](job.params)
+            # Output is handled before the job counts as completed, so a
+            # failing on_result is retried or recorded instead of lost
+            if self.on_result is not None:
+                self.on_result(job, result)
+        except Exception as e:
+            error = e
+
+        with self.lock:
+            self.budget(job.provider).release()
+            del self.running[job.id]
+            job.attempts += 1
+
+            if error is None:
+                self.completed.add(job.id)
+                self.results[job.id] = result
+            elif is_transient(error) and job.attempts <= self.max_retries:
+                delay = self.backoff * 2 ** (job.attempts - 1)
+                job.not_before = time.monotonic() + delay
+                self.push(job)
+            else:
+                self.failed[job.id] = {**job.to_dict(), "error": str(error)}
+
+            self.save_state()
+            self.lock.notify_all()
+
+    def load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+
+        with open(self.state_file, "r") as f:
+            state = json.load(f)
+
+        self.completed = set(state.get("completed", []))
+        self.failed = state.get("failed", {})
+        for data in state.get("pending", []):
+            job = Job.from_dict(data)
+            if job.id not in self.completed:
+                self.push(job)
+
+    def save_state(self):
+        if not self.state_file:
+            return
+
+        # Running jobs are saved as pending so they're redone after a crash
+        pending = list(self.queued.values()) + list(self.running.values())
+        state = {
+            "completed": sorted(self.completed),
+            "failed": self.failed,
+            "pending": [job.to_dict() for job in pending],
+        }
+
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_file)
@@ -0,0 +1,49 @@
+from typing import Any, Dict, List
+
+# Output formats for parsed results. Row-parsed results (Zacks) are built
+# straight into Arrow from the parsed columns, so the Arrow and Polars formats
+# don't need pandas. Polars frames are zero-copy views over the Arrow table.
+
+PANDAS = "pandas"
+ARROW = "arrow"
+POLARS = "polars"
+
+formats = (PANDAS, ARROW, POLARS)
+
+
+def check_format(fmt: str):
+    if fmt not in formats:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return fmt
+
+
+def build_frame(rows: List[Dict[str, Any]], columns: List[str], fmt=PANDAS):
+    if fmt == PANDAS:
+        import pandas as pd
+
+        return pd.DataFrame(rows, columns=columns)
+
+    import pyarrow as pa
+
+    table = pa.table({column: [row.get(column) for row in rows] for column in columns})
+    return arrow_to(table, fmt)
+
+
+def convert_frame(df, fmt=PANDAS):
+    # For clients that parse into pandas (WSH, AlphaVantage)
+    if fmt == PANDAS:
+        return df
+
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return arrow_to(table, fmt)
+
+
+def arrow_to(table, fmt):
+    if fmt == POLARS:
+        import polars as pl
+
+        return pl.from_arrow(table)
+
+    return table
@@ -0,0 +1,158 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, List
+
+from .errors import ErrorCollector
+
+# Parse raw response bodies in worker processes so the CPU-bound parts
+# (BeautifulSoup cells, ET.fromstring, date conversion) are not held back
+# by the GIL while fetching continues on threads. Parse failures recorded in
+# a worker are merged into the collector passed to submit(), and the failure
+# threshold is applied there.
+
+PICKLE = "pickle"
+ARROW = "arrow"
+
+
+def _encode_frame(df, fmt: str):
+    if fmt == ARROW:
+        try:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return (ARROW, sink.getvalue().to_pybytes())
+        except Exception:
+            # Mixed object columns can't always be expressed in Arrow,
+            # fall back to pickle
+            pass
+
+    # The executor pickles the result on its way back, pandas frames pickle
+    # their column blocks whole
+    return (PICKLE, df)
+
+
+def _decode_frame(payload):
+    fmt, data = payload
+    if fmt == ARROW:
+        import pyarrow as pa
+
+        return pa.ipc.open_stream(data).read_all().to_pandas()
+
+    return data
+
+
+class WorkerErrors(ErrorCollector):
+    # Records for the caller's collector, checks are replayed there so its
+    # failure threshold applies
+    def __init__(self, max_samples):
+        super().__init__(max_samples)
+        self.checks = []
+
+    def check(self, context: str, rows: int, errors: int):
+        self.checks.append((context, rows, errors))
+
+
+def _parse_wsh(body: str, string_dates=False, **kwargs):
+    from .WSH.wsh_client import WSHClient
+
+    return WSHClient(None, None, string_dates=string_dates).parse_response(body)
+
+
+def _parse_earnings_calendar(body: str, tab=None, errors=None, **kwargs):
+    from .Zacks.earnings_calendar import EarningsCalendarScraper
+
+    return EarningsCalendarScraper(None, errors=errors).parse_tab(body, tab)
+
+
+def _parse_earnings_release(body: str, errors=None, **kwargs):
+    from .Zacks.earnings_releases import EarningsReleaseScraper
+
+    return EarningsReleaseScraper(None, errors=errors).parse_response(body)
+
+
+def _parse_earnings_release_day(bodies, timestamp=None, errors=None, **kwargs):
+    # bodies maps EarningsReleaseTab names to the raw tabs of one day
+    import datetime
+    from .Zacks.earnings_releases import EarningsReleaseScraper, EarningsReleaseTab
+
+    bodies = {EarningsReleaseTab[name]: body for name, body in bodies.items()}
+    timestamp = datetime.datetime.fromtimestamp(timestamp)
+    return EarningsReleaseScraper(None, errors=errors).assemble(bodies, timestamp)
+
+
+parsers = {
+    "wsh": _parse_wsh,
+    "earnings_calendar": _parse_earnings_calendar,
+    "earnings_release": _parse_earnings_release,
+    "earnings_release_day": _parse_earnings_release_day,
+}
+
+
+def _parse(kind: str, body: str, fmt: str, kwargs, max_samples):
+    errors = WorkerErrors(max_samples)
+    result = parsers[kind](body, errors=errors, **kwargs)
+
+    # WSH responses parse into a frame per event class
+    if isinstance(result, dict):
+        encoded = {key: _encode_frame(df, fmt) for key, df in result.items()}
+    else:
+        encoded = _encode_frame(result, fmt)
+    return encoded, errors.export(), errors.checks
+
+
+def _decode_result(result):
+    if isinstance(result, dict):
+        return {key: _decode_frame(payload) for key, payload in result.items()}
+    return _decode_frame(result)
+
+
+class ParsePool:
+    def __init__(self, max_workers=None, fmt: str = PICKLE):
+        if fmt not in (PICKLE, ARROW):
+            raise ValueError(f"Unknown transfer format: {fmt}")
+
+        self.fmt = fmt
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def submit(
+        self, kind: str, body: str, errors: ErrorCollector = None, **kwargs
+    ) -> Future:
+        if kind not in parsers:
+            raise ValueError(f"Unknown parser: {kind}")
+
+        max_samples = errors.max_samples if errors is not None else 0
+        inner = self.executor.submit(
+            _parse, kind, body, self.fmt, kwargs, max_samples
+        )
+        outer = Future()
+
+        def done(f: Future):
+            try:
+                encoded, exported, checks = f.result()
+                if errors is not None:
+                    errors.merge(exported)
+                    for context, rows, failed in checks:
+                        errors.check(context, rows, failed)
+                outer.set_result(_decode_result(encoded))
+            except Exception as e:
+                outer.set_exception(e)
+
+        inner.add_done_callback(done)
+        return outer
+
+    def map(
+        self, kind: str, bodies: Iterable[str], errors: ErrorCollector = None, **kwargs
+    ) -> List:
+        futures = [self.submit(kind, body, errors, **kwargs) for body in bodies]
+        return [f.result() for f in futures]
@@ -0,0 +1,198 @@
+from bisect import bisect_right
+from datetime import date, datetime, time
+from functools import partial
+from typing import Iterable
+import random
+import threading
+import time as clock
+
+from . import trading_calendar
+from .Zacks.earnings_calendar import EarningsCalendarTab
+
+# Pre-open cache warming. Zacks calendar tabs and WSH classes for the next
+# few trading days are fetched through the clients in the quiet period, with
+# requests staggered, and put in the clients' SingleFlight memo with a ttl of
+# their own, so open-time reads are cache hits and other calls on the clients
+# keep their usual ttl. The memo is in-process, so readers must share the
+# clients (or their SingleFlight) with the Prefetcher, call
+# scrape_earnings_calendar with midnight datetimes and run_query with the
+# same date range.
+#
+# Items for today and the next trading day refresh every near_refresh
+# seconds, later ones every far_refresh. A refresh that returns the same data
+# doubles the item's interval up to max_refresh, a change resets it.
+
+default_tabs = (
+    EarningsCalendarTab.EARNINGS,
+    EarningsCalendarTab.GUIDANCE,
+    EarningsCalendarTab.REVISIONS,
+)
+
+
+def same_result(old, new):
+    # WSHClient.request_parsed returns (body, frames), compare the bodies
+    if isinstance(old, tuple):
+        return old[0] == new[0]
+    try:
+        return bool(old.equals(new))
+    except Exception:
+        return False
+
+
+class PrefetchItem:
+    def __init__(self, flights, key, offset: int, fetch):
+        self.flights = flights
+        self.key = key
+        # Trading days from today
+        self.offset = offset
+        self.fetch = fetch
+        self.result = None
+        self.interval = None
+        self.due = 0.0
+        self.error = None
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        scraper=None,
+        wsh=None,
+        days=3,
+        tabs: Iterable[EarningsCalendarTab] = default_tabs,
+        wsh_classes: Iterable[str] = ("ed",),
+        stagger=2.0,
+        near_refresh=15 * 60,
+        far_refresh=2 * 60 * 60,
+        max_refresh=6 * 60 * 60,
+    ):
+        self.scraper = scraper
+        self.wsh = wsh
+        self.days = days
+        self.tabs = list(tabs)
+        self.wsh_classes = list(wsh_classes)
+        self.stagger = stagger
+        self.near_refresh = near_refresh
+        self.far_refresh = far_refresh
+        self.max_refresh = max_refresh
+        self.items = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def upcoming_days(self, today: date = None):
+        day = trading_calendar.next_trading_day(today or date.today())
+        days = [day]
+        while len(days) < self.days:
+            days.append(trading_calendar.next_trading_day(days[-1], inclusive=False))
+        return days
+
+    def plan(self, today: date = None):
+        days = self.upcoming_days(today)
+        planned = {}
+
+        if self.scraper is not None:
+            for offset, day in enumerate(days):
+                dt = datetime.combine(day, time())
+                for tab in self.tabs:
+                    key = self.scraper.calendar_key(tab, dt)
+                    fetch = partial(self.scraper.scrape_earnings_calendar, tab, dt)
+                    item = PrefetchItem(self.scraper.flights, key, offset, fetch)
+                    planned[key] = item
+
+        if self.wsh is not None and self.wsh_classes:
+            start = days[0].strftime("%m/%d/%Y")
+            end = days[-1].strftime("%m/%d/%Y")
+            for cls, dates in self.wsh.plan_requests(self.wsh_classes, start, end):
+                url = self.wsh.build_url(cls, dates, "*")
+                key = self.wsh.request_key(url)
+                # Windows refresh as often as the nearest day they cover
+                window_start = datetime.strptime(dates[0], "%m/%d/%Y").date()
+                offset = max(0, bisect_right(days, window_start) - 1)
+                fetch = partial(self.wsh.request_parsed, url)
+                planned[key] = PrefetchItem(self.wsh.flights, key, offset, fetch)
+
+        return planned
+
+    def base_interval(self, item: PrefetchItem):
+        return self.near_refresh if item.offset <= 1 else self.far_refresh
+
+    def refresh(self, item: PrefetchItem):
+        # Drop the memoized result so the fetch goes to the source
+        item.flights.forget(item.key)
+        try:
+            result = item.fetch()
+        except Exception as e:
+            item.error = e
+            retry = min(self.base_interval(item), self.near_refresh)
+            item.due = clock.monotonic() + retry
+            return False
+
+        if item.result is not None and same_result(item.result, result):
+            item.interval = min(item.interval * 2, self.max_refresh)
+        else:
+            item.interval = self.base_interval(item)
+
+        item.result = result
+        item.error = None
+        item.due = clock.monotonic() + item.interval
+        # Valid until the next refresh, with room for a full staggered round.
+        # If that refresh fails the entry expires and reads go to the source.
+        ttl = item.interval + self.stagger * 1.5 * len(self.items)
+        item.flights.put(item.key, result, ttl)
+        return True
+
+    def run_once(self, today: date = None):
+        # Fetch the items that are due, returns how many were fetched
+        planned = self.plan(today)
+        # Keep refresh state for items still in the window, days that rolled
+        # off are dropped
+        for key in planned:
+            if key in self.items:
+                planned[key] = self.items[key]
+        self.items = planned
+
+        now = clock.monotonic()
+        due = sorted(
+            (item for item in self.items.values() if item.due <= now),
+            key=lambda item: (item.offset, item.due),
+        )
+
+        fetched = 0
+        for i, item in enumerate(due):
+            if self.stopped.is_set():
+                break
+            if i > 0:
+                # Spread requests out, with jitter so separate processes drift
+                self.stopped.wait(self.stagger * random.uniform(0.5, 1.5))
+            fetched += self.refresh(item)
+
+        return fetched
+
+    def next_due(self):
+        if not self.items:
+            return 0.0
+        due = min(item.due for item in self.items.values())
+        return max(0.0, due - clock.monotonic())
+
+    def run(self, until: datetime = None):
+        # Refresh until the deadline (e.g. the market open) or stop()
+        while not self.stopped.is_set():
+            if until is not None and datetime.now() >= until:
+                break
+            self.run_once()
+
+            wait = self.next_due()
+            if until is not None:
+                wait = min(wait, (until - datetime.now()).total_seconds())
+            self.stopped.wait(max(wait, self.stagger))
+
+    def start(self, until: datetime = None):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, args=(until,), daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,165 @@
+from datetime import datetime
+from typing import Dict, List
+import pandas as pd
+
+from .symbols import normalize_ticker
+
+# Reconcile earnings dates from AlphaVantage, Zacks and WSH into one consensus
+# date per ticker and fiscal period. Every source is first normalized to
+# (ticker, period_end, date, source), then joined with sorted-key merges and
+# grouped hash aggregations, no per-ticker loops.
+
+ALPHAVANTAGE = "alphavantage"
+ZACKS_CALENDAR = "zacks_calendar"
+ZACKS_RELEASE = "zacks_release"
+WSH = "wsh"
+
+default_weights = {
+    WSH: 3.0,
+    ZACKS_RELEASE: 2.0,
+    ZACKS_CALENDAR: 2.0,
+    ALPHAVANTAGE: 1.0,
+}
+
+normalized_columns = ["ticker", "period_end", "date", "source"]
+
+
+def to_naive_dates(column: pd.Series, fmt=None) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(column):
+        dates = column
+    else:
+        dates = pd.to_datetime(column, errors="coerce", format=fmt)
+
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.dt.normalize()
+
+
+def normalize(tickers, period_end, dates, source: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ticker": normalize_ticker(tickers).to_numpy(),
+            "period_end": period_end.to_numpy(),
+            "date": dates.to_numpy(),
+            "source": source,
+        }
+    )
+
+
+def from_alphavantage(df: pd.DataFrame) -> pd.DataFrame:
+    # AlphaVantageClient.get_erd
+    return normalize(
+        df["symbol"],
+        to_naive_dates(df["fiscalDateEnding"], "%Y-%m-%d"),
+        to_naive_dates(df["reportDate"], "%Y-%m-%d"),
+        ALPHAVANTAGE,
+    )
+
+
+def from_zacks_calendar(df: pd.DataFrame, dt: datetime) -> pd.DataFrame:
+    # EarningsCalendarTab.EARNINGS rows for the day they were scraped
+    dates = pd.Series(pd.Timestamp(dt).normalize(), index=df.index)
+    return normalize(
+        df["symbol"], pd.Series(pd.NaT, index=df.index), dates, ZACKS_CALENDAR
+    )
+
+
+def from_zacks_releases(df: pd.DataFrame) -> pd.DataFrame:
+    # EarningsReleaseScraper.scrape
+    return normalize(
+        df["hticker"],
+        pd.Series(pd.NaT, index=df.index),
+        to_naive_dates(df["eadate"], "%Y%m%d"),
+        ZACKS_RELEASE,
+    )
+
+
+def from_wsh(df: pd.DataFrame) -> pd.DataFrame:
+    # WSH db or ed class, native or legacy string dates
+    return normalize(
+        df["stock_symbol"],
+        to_naive_dates(df["quarter_end_date"], "%Y%m%d"),
+        to_naive_dates(df["earnings_date"], "%Y%m%d"),
+        WSH,
+    )
+
+
+def assign_periods(events: pd.DataFrame, tolerance_days=45) -> pd.DataFrame:
+    # Fiscal period as the month of the quarter end date
+    events = events.dropna(subset=["ticker", "date"])
+    known = events[events["period_end"].notna()]
+    unknown = events[events["period_end"].isna()].drop(columns="period_end")
+
+    # Sources without a fiscal period take the period of the nearest dated
+    # event of the same ticker
+    if len(unknown) > 0 and len(known) > 0:
+        anchors = (
+            known[["ticker", "date", "period_end"]]
+            .drop_duplicates(["ticker", "date"])
+            .sort_values("date")
+        )
+        unknown = pd.merge_asof(
+            unknown.sort_values("date"),
+            anchors,
+            on="date",
+            by="ticker",
+            direction="nearest",
+            tolerance=pd.Timedelta(days=tolerance_days),
+        )
+    else:
+        unknown = unknown.assign(period_end=pd.NaT)
+
+    # Otherwise fall back to the calendar quarter before the report date
+    missing = unknown["period_end"].isna()
+    unknown.loc[missing, "period_end"] = (
+        unknown.loc[missing, "date"].dt.to_period("Q") - 1
+    ).dt.end_time.dt.normalize()
+
+    events = pd.concat([known, unknown[normalized_columns]], ignore_index=True)
+    events["period"] = pd.to_datetime(events["period_end"]).dt.to_period("M")
+    return events
+
+
+def reconcile(
+    frames: List[pd.DataFrame],
+    weights: Dict[str, float] = None,
+    tolerance_days=45,
+) -> pd.DataFrame:
+    weights = {**default_weights, **(weights or {})}
+
+    events = pd.concat(frames, ignore_index=True)
+    events = assign_periods(events, tolerance_days)
+    events = events.drop_duplicates(["ticker", "period", "date", "source"])
+    events["weight"] = events["source"].map(weights).fillna(1.0)
+
+    keys = ["ticker", "period"]
+
+    # Total weight behind each candidate date, the heaviest one wins
+    votes = events.groupby(keys + ["date"], observed=True)["weight"].sum()
+    votes = votes.reset_index().sort_values(
+        keys + ["weight", "date"], ascending=[True, True, False, True]
+    )
+    consensus = votes.drop_duplicates(keys).rename(
+        columns={"date": "consensus_date", "weight": "consensus_weight"}
+    )
+
+    totals = events.groupby(keys, observed=True).agg(
+        total_weight=("weight", "sum"), n_sources=("source", "nunique")
+    )
+    consensus = consensus.merge(totals.reset_index(), on=keys)
+    consensus["confidence"] = consensus["consensus_weight"] / consensus["total_weight"]
+
+    # Per source date and whether it agrees with the consensus
+    events = events.merge(consensus[keys + ["consensus_date"]], on=keys)
+    events["agrees"] = events["date"] == events["consensus_date"]
+    per_source = events.pivot_table(
+        index=keys,
+        columns="source",
+        values=["date", "agrees"],
+        aggfunc={"date": "min", "agrees": "max"},
+    )
+    per_source.columns = [f"{value}_{source}" for value, source in per_source.columns]
+
+    result = consensus.merge(per_source.reset_index(), on=keys, how="left")
+    result = result.drop(columns=["consensus_weight", "total_weight"])
+    return result.sort_values(keys, ignore_index=True)
@@ -0,0 +1,80 @@
+import threading
+import time
+
+# Single-flight request coalescing. Concurrent calls with the same key share
+# one in-flight fetch and parse; later callers block until the first one
+# finishes and get the same result (or exception). With ttl > 0 the result
+# is also memoized for ttl seconds, put() memoizes a single key with its own
+# ttl.
+#
+# Callers sharing a result get the same object, copy it before mutating.
+# Each client has its own group unless one is passed in as flights=.
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.memo = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            if self.memo:
+                hit = self.memo.get(key)
+                if hit is not None and hit[0] > time.monotonic():
+                    return hit[1]
+
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = Call()
+                self.calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+                if self.ttl > 0 and call.error is None:
+                    self.memoize(key, call.result)
+            call.done.set()
+
+        return call.result
+
+    def memoize(self, key, result, ttl=None):
+        now = time.monotonic()
+        # Drop expired entries so the memo doesn't grow without bound
+        expired = [k for k, (expires, _) in self.memo.items() if expires <= now]
+        for k in expired:
+            del self.memo[k]
+
+        self.memo[key] = (now + (self.ttl if ttl is None else ttl), result)
+
+    def put(self, key, result, ttl):
+        with self.lock:
+            self.memoize(key, result, ttl)
+
+    def forget(self, key):
+        with self.lock:
+            self.memo.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.memo.clear()
@@ -0,0 +1,171 @@
+from typing import Sequence
+import numpy as np
+import pandas as pd
+
+from .symbols import normalize_ticker
+
+# Earnings-surprise analytics over the combined multi-ticker EPS history from
+# AlphaVantageClient.get_eps_history (hticker, eadate, av_actual, av_est),
+# optionally joined with Zacks release eps_est / eps_actual. Everything runs
+# as grouped column operations on one frame sorted by (hticker, eadate), no
+# per-ticker loops.
+
+KEYS = ["hticker", "eadate"]
+
+# (actual, estimate, prefix) pairs, Zacks ones are used when present
+sources = [
+    ("av_actual", "av_est", "av"),
+    ("zacks_actual", "zacks_est", "zacks"),
+]
+
+
+def to_numbers(column: pd.Series) -> pd.Series:
+    # AlphaVantage sends "None", Zacks "$1.23", "--" and thousands separators
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype("float64")
+    cleaned = column.astype(str).str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
+
+def prepare(eps: pd.DataFrame, releases: pd.DataFrame = None) -> pd.DataFrame:
+    df = eps[KEYS + ["av_actual", "av_est"]].copy()
+    df["hticker"] = normalize_ticker(df["hticker"])
+    df["eadate"] = pd.to_datetime(df["eadate"], format="%Y%m%d", errors="coerce")
+    df["av_actual"] = to_numbers(df["av_actual"])
+    df["av_est"] = to_numbers(df["av_est"])
+
+    if releases is not None and len(releases) > 0:
+        zacks = releases[KEYS + ["eps_est", "eps_actual"]].rename(
+            columns={"eps_est": "zacks_est", "eps_actual": "zacks_actual"}
+        )
+        zacks["hticker"] = normalize_ticker(zacks["hticker"])
+        zacks["eadate"] = pd.to_datetime(
+            zacks["eadate"], format="%Y%m%d", errors="coerce"
+        )
+        zacks["zacks_est"] = to_numbers(zacks["zacks_est"])
+        zacks["zacks_actual"] = to_numbers(zacks["zacks_actual"])
+        zacks = zacks.drop_duplicates(KEYS, keep="last")
+        df = df.merge(zacks, on=KEYS, how="outer")
+
+    df = df.dropna(subset=KEYS).drop_duplicates(KEYS, keep="last")
+    return df.sort_values(KEYS, ignore_index=True)
+
+
+def run_starts(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # True where a new run of equal values starts within a group
+    starts = np.ones(len(values), dtype=bool)
+    starts[1:] = (groups[1:] != groups[:-1]) | (values[1:] != values[:-1])
+    return starts
+
+
+def streaks(groups: np.ndarray, signs: np.ndarray) -> np.ndarray:
+    # Signed length of the current run of beats (+) or misses (-), 0 for
+    # in-line or unknown quarters
+    starts = run_starts(groups, signs)
+    run_ids = np.cumsum(starts) - 1
+    positions = np.arange(len(signs))
+    run_lengths = positions - np.flatnonzero(starts)[run_ids] + 1
+    return np.where(signs == 0, 0, run_lengths * signs).astype("int64")
+
+
+def rolling_zscore(
+    groups: pd.Series, values: pd.Series, window=8, min_periods=4
+) -> pd.Series:
+    # z-score of each value against the previous window values of the same
+    # group (no look-ahead), from grouped running sums
+    valid = values.notna()
+    x = values.where(valid, 0.0)
+    count = valid.astype("float64")
+
+    def window_sum(column: pd.Series):
+        running = column.groupby(groups).cumsum() - column
+        dropped = running.groupby(groups).shift(window).fillna(0.0)
+        return running - dropped
+
+    n = window_sum(count)
+    s1 = window_sum(x)
+    s2 = window_sum(x * x)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / n
+        var = (s2 - n * mean * mean) / (n - 1)
+        std = np.sqrt(var.clip(lower=0.0))
+        z = (values - mean) / std
+
+    return z.where((n >= min_periods) & (std > 0) & valid)
+
+
+def surprises(
+    eps: pd.DataFrame,
+    releases: pd.DataFrame = None,
+    window=8,
+    min_periods=4,
+) -> pd.DataFrame:
+    # Surprise, surprise %, beat/miss sign and streak and rolling z-score of
+    # the surprise % for every source with data
+    df = prepare(eps, releases)
+    groups = df["hticker"]
+    group_codes = pd.factorize(groups)[0]
+
+    for actual, estimate, prefix in sources:
+        if actual not in df.columns:
+            continue
+
+        surprise = df[actual] - df[estimate]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = surprise / df[estimate].abs() * 100
+        pct = pct.where(df[estimate] != 0)
+
+        signs = np.sign(surprise.to_numpy())
+        signs = np.nan_to_num(signs, nan=0.0).astype("int64")
+
+        df[f"{prefix}_surprise"] = surprise
+        df[f"{prefix}_surprise_pct"] = pct
+        df[f"{prefix}_beat"] = signs
+        df[f"{prefix}_streak"] = streaks(group_codes, signs)
+        df[f"{prefix}_surprise_z"] = rolling_zscore(groups, pct, window, min_periods)
+
+    return df
+
+
+def post_announcement_returns(
+    events: pd.DataFrame, prices: pd.DataFrame, windows: Sequence[int] = (1, 5, 20)
+) -> pd.DataFrame:
+    # Close-to-close returns from the last close before each announcement to
+    # the close k trading sessions later. prices is long format
+    # (ticker, date, close).
+    prices = prices[["ticker", "date", "close"]].copy()
+    prices["ticker"] = normalize_ticker(prices["ticker"])
+    prices["date"] = pd.to_datetime(prices["date"]).dt.normalize()
+    prices = prices.dropna().sort_values(["ticker", "date"], ignore_index=True)
+    prices["row"] = np.arange(len(prices))
+
+    base = pd.merge_asof(
+        events[KEYS].reset_index().sort_values("eadate"),
+        prices.sort_values("date"),
+        left_on="eadate",
+        right_on="date",
+        left_by="hticker",
+        right_by="ticker",
+        allow_exact_matches=False,
+    ).set_index("index")
+    base = base.reindex(events.index)
+
+    close = prices["close"].to_numpy()
+    tickers = prices["ticker"].to_numpy()
+    has_base = base["row"].notna().to_numpy()
+    rows = base["row"].fillna(0).to_numpy().astype("int64")
+
+    result = events.copy()
+    for k in windows:
+        target = rows + k
+        ok = has_base & (target < len(prices))
+        target = np.where(ok, target, 0)
+        # The target row has to belong to the same ticker
+        ok &= tickers[target] == tickers[rows]
+
+        returns = np.full(len(events), np.nan)
+        returns[ok] = close[target[ok]] / close[rows[ok]] - 1
+        result[f"return_{k}d"] = returns
+
+    return result
@@ -0,0 +1,129 @@
+from typing import Iterable
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Global symbol table. Tickers from every source are normalized the hticker
+# way ("-" -> ".", upper case) and interned to compact int32 IDs, so frames
+# can carry a symbol_id column and cross-source joins run on integer keys.
+# WSH company_id and ISIN are registered as aliases of the same ID.
+
+ID_COLUMN = "symbol_id"
+MISSING_ID = -1
+
+
+def normalize_ticker(tickers: pd.Series) -> pd.Series:
+    return (
+        tickers.astype(str)
+        .str.strip()
+        .str.upper()
+        .str.replace("-", ".", regex=False)
+    )
+
+
+class SymbolTable:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.symbols = []
+        self.ids = {}
+        self.aliases = {"company_id": {}, "isin": {}}
+        self.index = pd.Index([], dtype=object)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def intern(self, tickers: Iterable[str]) -> np.ndarray:
+        tickers = pd.Series(tickers, dtype=object)
+        missing = tickers.isna().to_numpy()
+        normalized = normalize_ticker(tickers)
+
+        with self.lock:
+            new = [s for s in normalized[~missing].unique() if s not in self.ids]
+            if new:
+                for symbol in new:
+                    self.ids[symbol] = len(self.symbols)
+                    self.symbols.append(symbol)
+                # IDs are append-only, the lookup index is rebuilt on growth
+                self.index = pd.Index(self.symbols, dtype=object)
+            index = self.index
+
+        ids = index.get_indexer(normalized).astype(np.int32)
+        ids[missing] = MISSING_ID
+        return ids
+
+    def lookup(self, tickers: Iterable[str]) -> np.ndarray:
+        # Like intern but unknown tickers map to MISSING_ID
+        tickers = pd.Series(tickers, dtype=object)
+        ids = self.index.get_indexer(normalize_ticker(tickers)).astype(np.int32)
+        ids[tickers.isna().to_numpy()] = MISSING_ID
+        return ids
+
+    def decode(self, ids: Iterable[int]) -> np.ndarray:
+        symbols = np.array(self.symbols + [None], dtype=object)
+        ids = np.asarray(ids, dtype=np.int64)
+        return symbols[np.where(ids < 0, len(self.symbols), ids)]
+
+    def add_aliases(self, kind: str, values: Iterable, ids: np.ndarray):
+        aliases = self.aliases[kind]
+        with self.lock:
+            for value, id in zip(values, ids):
+                if value is not None and not pd.isna(value) and id >= 0:
+                    aliases[str(value)] = int(id)
+
+    def lookup_alias(self, kind: str, values: Iterable) -> np.ndarray:
+        aliases = self.aliases[kind]
+        return np.array(
+            [aliases.get(str(value), MISSING_ID) for value in values], dtype=np.int32
+        )
+
+    def seed_listing(self, df: pd.DataFrame):
+        # AlphaVantageClient.get_active_tickers / get_delisted_tickers
+        self.intern(df["symbol"])
+
+    def seed_wsh(self, df: pd.DataFrame):
+        ids = self.intern(df["stock_symbol"])
+        self.add_aliases("company_id", df["company_id"], ids)
+        self.add_aliases("isin", df["isin"], ids)
+        return ids
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"symbols": self.symbols, "aliases": self.aliases}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        table = cls()
+        with open(path, "r") as f:
+            state = json.load(f)
+        table.symbols = state["symbols"]
+        table.ids = {symbol: i for i, symbol in enumerate(table.symbols)}
+        table.aliases = state["aliases"]
+        table.index = pd.Index(table.symbols, dtype=object)
+        return table
+
+
+def add_symbol_ids(frame, column: str, table: SymbolTable):
+    # Append a symbol_id column to a pandas, Arrow or Polars frame
+    if isinstance(frame, pd.DataFrame):
+        frame[ID_COLUMN] = table.intern(frame[column])
+        return frame
+
+    if hasattr(frame, "append_column"):
+        import pyarrow as pa
+
+        ids = table.intern(frame.column(column).to_pylist())
+        return frame.append_column(ID_COLUMN, pa.array(ids, type=pa.int32()))
+
+    import polars as pl
+
+    ids = table.intern(frame[column].to_list())
+    return frame.with_columns(pl.Series(ID_COLUMN, ids, dtype=pl.Int32))
+
+
+# Process-wide table for callers that want every client on one table
+symbol_table = SymbolTable()
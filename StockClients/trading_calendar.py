@@ -0,0 +1,123 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List, Union
+
+# NYSE trading calendar computed locally. Used by the backfill planners to
+# skip weekends and market holidays, which only return empty payloads.
+
+# One-off closures that don't follow a rule
+special_closures = {
+    date(2001, 9, 11),
+    date(2001, 9, 12),
+    date(2001, 9, 13),
+    date(2001, 9, 14),
+    date(2004, 6, 11),  # Reagan
+    date(2007, 1, 2),  # Ford
+    date(2012, 10, 29),  # Hurricane Sandy
+    date(2012, 10, 30),
+    date(2018, 12, 5),  # G.H.W. Bush
+    date(2025, 1, 9),  # Carter
+}
+
+
+def easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    # n-th weekday (Mon=0) of the month, n=-1 for the last one
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def observed(holiday: date) -> date:
+    # Saturday holidays move to Friday, Sunday holidays to Monday
+    if holiday.weekday() == 5:
+        return holiday - timedelta(days=1)
+    if holiday.weekday() == 6:
+        return holiday + timedelta(days=1)
+    return holiday
+
+
+@lru_cache(maxsize=None)
+def nyse_holidays(year: int) -> frozenset:
+    holidays = set()
+
+    # New Year's Day isn't moved back into the previous year when it falls
+    # on a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(observed(new_year))
+
+    if year >= 1998:
+        holidays.add(nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr. Day
+    holidays.add(nth_weekday(year, 2, 0, 3))  # Washington's Birthday
+    holidays.add(easter(year) - timedelta(days=2))  # Good Friday
+    holidays.add(nth_weekday(year, 5, 0, -1))  # Memorial Day
+    if year >= 2022:
+        holidays.add(observed(date(year, 6, 19)))  # Juneteenth
+    holidays.add(observed(date(year, 7, 4)))  # Independence Day
+    holidays.add(nth_weekday(year, 9, 0, 1))  # Labor Day
+    holidays.add(nth_weekday(year, 11, 3, 4))  # Thanksgiving
+    holidays.add(observed(date(year, 12, 25)))  # Christmas
+
+    holidays |= {d for d in special_closures if d.year == year}
+    return frozenset(holidays)
+
+
+def to_date(d: Union[date, datetime]) -> date:
+    return d.date() if isinstance(d, datetime) else d
+
+
+def is_trading_day(d: Union[date, datetime]) -> bool:
+    d = to_date(d)
+    return d.weekday() < 5 and d not in nyse_holidays(d.year)
+
+
+def next_trading_day(d: Union[date, datetime], inclusive=True) -> date:
+    d = to_date(d)
+    if not inclusive:
+        d += timedelta(days=1)
+    while not is_trading_day(d):
+        d += timedelta(days=1)
+    return d
+
+
+def previous_trading_day(d: Union[date, datetime], inclusive=True) -> date:
+    d = to_date(d)
+    if not inclusive:
+        d -= timedelta(days=1)
+    while not is_trading_day(d):
+        d -= timedelta(days=1)
+    return d
+
+
+def trading_days(
+    start: Union[date, datetime], end: Union[date, datetime]
+) -> List[date]:
+    # Trading days in [start, end]
+    day = to_date(start)
+    end = to_date(end)
+    days = []
+    while day <= end:
+        if is_trading_day(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
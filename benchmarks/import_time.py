@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Import-time regression guard. Each case runs in a fresh interpreter and
+# fails if it takes longer than its budget or pulls in a heavy dependency it
+# shouldn't need yet.
+#
+#   python benchmarks/import_time.py [--repeat 5] [--scale 1.0]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "numpy", "duckdb", "bs4", "xml.etree.ElementTree"]
+
+# Declared dependencies. A case is skipped only when one of these isn't
+# installed, any other import error fails it.
+THIRD_PARTY = {"pandas", "numpy", "duckdb", "bs4", "requests", "urllib3", "dotenv"}
+
+# (statement, budget in ms, heavy modules allowed to be loaded)
+cases = [
+    ("import StockClients", 50, []),
+    ("import StockClients.Zacks", 50, []),
+    (
+        "from StockClients.WSH import WSHClient",
+        1500,
+        ["pandas", "numpy", "xml.etree.ElementTree"],
+    ),
+    ("from StockClients.Zacks import ZacksScraper", 1500, []),
+    (
+        "from StockClients.AlphaVantage import AlphaVantageClient",
+        1500,
+        ["pandas", "numpy"],
+    ),
+]
+
+probe = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    exec({statement!r})
+except ModuleNotFoundError as e:
+    print(json.dumps({{"missing": e.name}}))
+    sys.exit(0)
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed, "heavy": heavy}}))
+"""
+
+
+def run_case(statement):
+    code = probe.format(statement=statement, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    failed = False
+    for statement, budget, allowed in cases:
+        try:
+            results = [run_case(statement) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"FAIL  {statement}: {e.stderr.strip().splitlines()[-1]}")
+            failed = True
+            continue
+
+        missing = results[0].get("missing")
+        if missing is not None:
+            if missing.split(".")[0] in THIRD_PARTY:
+                print(f"SKIP  {statement}: {missing} is not installed")
+            else:
+                print(f"FAIL  {statement}: No module named {missing!r}")
+                failed = True
+            continue
+
+        best = min(r["ms"] for r in results)
+        unexpected = [m for m in results[0]["heavy"] if m not in allowed]
+        ok = best <= budget * args.scale and not unexpected
+        failed = failed or not ok
+
+        status = "OK  " if ok else "FAIL"
+        limit = budget * args.scale
+        print(f"{status}  {statement}: {best:.1f} ms (budget {limit:.0f} ms)")
+        if unexpected:
+            print(f"      unexpected imports: {', '.join(unexpected)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,19 @@ setup(
         "pandas",
         "bs4",
         "duckdb",
+        # Parquet output (cli, WSH spill, screen history, archive re-parse)
+        "pyarrow",
         "python-dotenv",
         "requests",
     ],
+    extras_require={
+        "arrow": ["pyarrow"],
+        "polars": ["pyarrow", "polars"],
+        "cookies": ["cryptography"],
+    },
+    entry_points={
+        "console_scripts": [
+            "stockclients-run=StockClients.cli:main",
+        ],
+    },
 )